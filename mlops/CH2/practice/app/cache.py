@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Cache key for free text: case-folded, whitespace collapsed."""
+    return " ".join(text.casefold().split())
+
+
+class TTLCache:
+    """Thread-safe LRU cache with optional per-entry TTL and hit/miss stats."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class AnswerCache:
+    """LRU cache of full /ask answers, optionally persisted to SQLite.
+
+    The key covers the normalized question, the retrieved chunks and the LLM
+    parameters, so the same question over different context is a miss.
+
+    Memory is checked first; the disk is only read on a memory miss. From
+    async code use `aget` / `aset`, which run the SQLite I/O in a thread.
+    Recency updates from disk hits are kept in memory and written with the
+    next `set`, and rows are evicted (least recently used first) only when
+    the table holds more than `maxsize` of them.
+
+    The disk is best effort: SQLite errors (e.g. the file locked by another
+    worker sharing ANSWER_CACHE_PATH) are logged and the entry is served
+    from / kept in memory only, so a cache fault never fails a request.
+    """
+
+    def __init__(self, maxsize: int = 512, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.memory = TTLCache(maxsize=maxsize)
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._rows = 0
+        self._touched: Dict[str, float] = {}  # key -> last_used, not yet written
+        if path:
+            try:
+                # Short busy timeout: on contention, fall back to memory quickly
+                self._db = sqlite3.connect(path, timeout=1.0, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS answers ("
+                    "key TEXT PRIMARY KEY, answer TEXT, prompt TEXT, last_used REAL)"
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)"
+                )
+                self._db.commit()
+                self._rows = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+                logger.info(f"Answer cache persisted at {path}")
+            except sqlite3.Error as e:
+                logger.error(f"Answer cache disk disabled: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(question: str, docs: List[Dict], params: Dict[str, Any]) -> str:
+        fingerprint = [(d.get("source", ""), d.get("text", "")) for d in docs]
+        raw = json.dumps(
+            [normalize_text(question), fingerprint, params],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        value = self.memory.get(key)
+        if value is not None or self._db is None:
+            return value
+        return self._read(key)
+
+    async def aget(self, key: str) -> Optional[Tuple[str, str]]:
+        """`get` for the event loop: memory hits stay inline, disk reads go to a thread."""
+        value = self.memory.get(key)
+        if value is not None or self._db is None:
+            return value
+        return await asyncio.to_thread(self._read, key)
+
+    def _read(self, key: str) -> Optional[Tuple[str, str]]:
+        with self._db_lock:
+            try:
+                row = self._db.execute(
+                    "SELECT answer, prompt FROM answers WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Answer cache read failed ({e}); treating as a miss")
+                return None
+            if row is None:
+                return None
+            # Recency only: written with the next set(), no commit here
+            self._touched[key] = time.time()
+        value = (row[0], row[1])
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Tuple[str, str]) -> None:
+        self.memory.set(key, value)
+        if self._db is not None:
+            self._write(key, value)
+
+    async def aset(self, key: str, value: Tuple[str, str]) -> None:
+        """`set` for the event loop: the SQLite write runs in a thread."""
+        self.memory.set(key, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._write, key, value)
+
+    def _write(self, key: str, value: Tuple[str, str]) -> None:
+        with self._db_lock:
+            touched, self._touched = self._touched, {}
+            try:
+                if touched:
+                    self._db.executemany(
+                        "UPDATE answers SET last_used = ? WHERE key = ?",
+                        [(used, k) for k, used in touched.items()],
+                    )
+                exists = self._db.execute(
+                    "SELECT 1 FROM answers WHERE key = ?", (key,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+                    (key, value[0], value[1], time.time()),
+                )
+                rows = self._rows + (exists is None)
+                if rows > self.maxsize:
+                    # LRU on disk: drop the least recently used rows over the limit
+                    self._db.execute(
+                        "DELETE FROM answers WHERE key IN "
+                        "(SELECT key FROM answers ORDER BY last_used LIMIT ?)",
+                        (rows - self.maxsize,),
+                    )
+                    rows = self.maxsize
+                self._db.commit()
+                self._rows = rows
+            except sqlite3.Error as e:
+                logger.warning(f"Answer cache write failed ({e}); kept in memory only")
+                self._rollback()
+
+    def _rollback(self) -> None:
+        try:
+            self._db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self._db is None:
+            return
+        with self._db_lock:
+            try:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+                self._rows = 0
+                self._touched.clear()
+            except sqlite3.Error as e:
+                logger.error(f"Answer cache disk clear failed: {e}")
+                self._rollback()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["persistent"] = self._db is not None
+        return stats
@@ -0,0 +1,214 @@
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rough subword estimate: bge's WordPiece splits Portuguese words into ~1.3 tokens
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•▪◦]|\d+[.)]|[a-zA-Z][.)])\s+")
+_NUMBERED_HEADING_RE = re.compile(r"^\s*(?:\d+\.)+\d*\s+\S")
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(_TOKEN_RE.findall(text)) * 1.3) + 1
+
+
+def load_token_counter(path: Optional[str]) -> Callable[[str], int]:
+    """Token counter for a local tokenizer.json (HuggingFace `tokenizers`).
+
+    Special tokens are not counted. Without `path`, or if the file cannot
+    be loaded, `estimate_tokens` is used.
+    """
+    if not path:
+        return estimate_tokens
+    try:
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_file(path)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer {path} ({e}); using estimates")
+        return estimate_tokens
+    logger.info(f"Tokenizer: {path}")
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class Chunker(ABC):
+    """Splits extracted document text into chunks for embedding."""
+
+    @abstractmethod
+    def split(self, text: str) -> List[str]:
+        ...
+
+
+class ParagraphChunker(Chunker):
+    """Original behaviour: one chunk per blank-line separated paragraph."""
+
+    def split(self, text: str) -> List[str]:
+        chunks = [c.strip() for c in text.split("\n\n") if c.strip()]
+        return chunks or ([text] if text.strip() else [])
+
+
+class StructuredChunker(Chunker):
+    """Token-budgeted chunks that respect headings, sentences and bullets.
+
+    Units (sentences, bullet items) are packed greedily up to `max_tokens`.
+    A heading always starts a new chunk and is repeated at the top of every
+    chunk of its section. Consecutive chunks share up to `overlap_tokens` of
+    trailing sentences. `max_tokens` is a hard limit: larger units are cut on
+    word boundaries (inside a word if it alone is too large). It is capped at
+    `hard_max_tokens`, the embedder's context. `token_counter` should be the
+    embedder's tokenizer (CHUNK_TOKENIZER); the default is an estimate. Every
+    unit is visited once, so the cost is linear in the document size.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 256,
+        overlap_tokens: int = 32,
+        hard_max_tokens: int = 512,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
+        self.max_tokens = min(max_tokens, hard_max_tokens)
+        self.overlap_tokens = overlap_tokens
+        self.hard_max_tokens = hard_max_tokens
+        self.count = token_counter
+
+    @staticmethod
+    def _is_heading(line: str) -> bool:
+        stripped = line.strip()
+        if not stripped or len(stripped) > 80 or stripped[-1] in ".;,":
+            return False
+        if stripped.startswith("#") or _NUMBERED_HEADING_RE.match(stripped):
+            return True
+        letters = [c for c in stripped if c.isalpha()]
+        return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+    def _units(self, text: str):
+        """Yields ("heading" | "unit", text) in document order."""
+        paragraph: List[str] = []
+
+        def flush():
+            if paragraph:
+                for sentence in _SENTENCE_END_RE.split(" ".join(paragraph)):
+                    if sentence.strip():
+                        yield "unit", sentence.strip()
+                paragraph.clear()
+
+        for line in text.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                yield from flush()
+            elif self._is_heading(stripped):
+                yield from flush()
+                yield "heading", stripped.lstrip("#").strip()
+            elif _BULLET_RE.match(stripped):
+                yield from flush()
+                yield "unit", stripped
+            else:
+                paragraph.append(stripped)
+        yield from flush()
+
+    def _fit(self, unit: str, budget: int) -> List[str]:
+        """Cuts a unit that is larger than `budget` tokens on word boundaries."""
+        if self.count(unit) <= budget:
+            return [unit]
+        words = unit.split()
+        if len(words) == 1:
+            return self._cut_word(unit, budget)
+        pieces: List[List[str]] = []
+        current, size = [], 0
+        for word in words:
+            tokens = self.count(word)
+            if current and size + tokens > budget:
+                pieces.append(current)
+                current, size = [], 0
+            current.append(word)
+            size += tokens
+        pieces.append(current)
+        if len(pieces) == 1:
+            # Per-word counts underestimated the whole (e.g. BPE merges): halve
+            half = len(words) // 2
+            pieces = [words[:half], words[half:]]
+        # Each piece is re-checked with the counter on its own text
+        return [fit for piece in pieces for fit in self._fit(" ".join(piece), budget)]
+
+    def _cut_word(self, word: str, budget: int) -> List[str]:
+        pieces = []
+        while word:
+            end = len(word)
+            while end > 1 and self.count(word[:end]) > budget:
+                end //= 2
+            pieces.append(word[:end])
+            word = word[end:]
+        return pieces
+
+    def split(self, text: str) -> List[str]:
+        chunks: List[str] = []
+        heading: Optional[str] = None
+        heading_tokens = 0
+        body: List[Tuple[str, int]] = []  # (unit, tokens)
+        body_tokens = 0
+        fresh = False  # body holds units not yet emitted
+
+        def emit():
+            parts = ([heading] if heading else []) + [u for u, _ in body]
+            chunks.append("\n".join(parts))
+
+        def overlap_tail() -> List[Tuple[str, int]]:
+            tail, size = [], 0
+            for unit, tokens in reversed(body):
+                if size + tokens > self.overlap_tokens:
+                    break
+                tail.append((unit, tokens))
+                size += tokens
+            return tail[::-1]
+
+        for kind, value in self._units(text):
+            if kind == "heading":
+                if fresh:
+                    emit()
+                heading = self._fit(value, self.max_tokens // 4)[0]
+                heading_tokens = self.count(heading)
+                body, body_tokens, fresh = [], 0, False
+                continue
+
+            budget = self.max_tokens - heading_tokens
+            for piece in self._fit(value, budget):
+                tokens = self.count(piece)
+                if body and heading_tokens + body_tokens + tokens > self.max_tokens:
+                    if fresh:
+                        emit()
+                    body = overlap_tail()
+                    body_tokens = sum(t for _, t in body)
+                    # The overlap must never push the chunk past the limit
+                    while body and heading_tokens + body_tokens + tokens > budget:
+                        body_tokens -= body.pop(0)[1]
+                body.append((piece, tokens))
+                body_tokens += tokens
+                fresh = True
+
+        if fresh:
+            emit()
+        return chunks
+
+
+CHUNKERS: Dict[str, Callable[[], Chunker]] = {
+    "paragraph": ParagraphChunker,
+    "structured": lambda: StructuredChunker(
+        max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", "256")),
+        overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "32")),
+        hard_max_tokens=int(os.getenv("CHUNK_HARD_MAX_TOKENS", "512")),
+        token_counter=load_token_counter(os.getenv("CHUNK_TOKENIZER")),
+    ),
+}
+
+
+def get_chunker(name: Optional[str] = None) -> Chunker:
+    name = name or os.getenv("CHUNKER", "structured")
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {name} (options: {', '.join(CHUNKERS)})")
+    return CHUNKERS[name]()
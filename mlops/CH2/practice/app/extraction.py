@@ -0,0 +1,236 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import docx
+import pypdf
+import pytesseract
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTENSIONS = {"pdf"}
+DOCX_EXTENSIONS = {"docx", "doc"}
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "tiff"}
+TXT_EXTENSIONS = {"txt"}
+SUPPORTED_EXTENSIONS = PDF_EXTENSIONS | DOCX_EXTENSIONS | IMAGE_EXTENSIONS | TXT_EXTENSIONS
+
+
+class ExtractionError(Exception):
+    """An extraction worker died (crash or EXTRACT_WORKER_MAX_MB exceeded)."""
+
+
+# --- Worker functions (run inside the process pool, must be top-level) ---
+
+
+def _limit_worker_memory(max_mb: int) -> None:
+    if max_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = max_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not cap extraction worker memory: {e}")
+
+
+def _ocr(image: Image.Image) -> str:
+    return pytesseract.image_to_string(image)
+
+
+def _extract_pdf_pages(content: bytes, start: int, end: int, ocr: bool) -> List[str]:
+    """Text of pages [start, end). Pages without a text layer are OCR'd."""
+    reader = pypdf.PdfReader(io.BytesIO(content))
+    pages = []
+    for page in reader.pages[start:end]:
+        text = page.extract_text() or ""
+        if not text.strip() and ocr:
+            text = "\n".join(_ocr(Image.open(io.BytesIO(img.data))) for img in page.images)
+        pages.append(text)
+    return pages
+
+
+def _ocr_tile(content: bytes, top: int, bottom: int) -> str:
+    image = Image.open(io.BytesIO(content))
+    return _ocr(image.crop((0, top, image.width, bottom)))
+
+
+def _extract_docx(content: bytes) -> str:
+    doc = docx.Document(io.BytesIO(content))
+    return "\n".join(para.text for para in doc.paragraphs)
+
+
+# --- Engine ---
+
+
+def _blank_row_near(gray: Image.Image, target: int, search: int) -> int:
+    """Closest row to `target` without ink, so OCR tiles don't cut text lines."""
+    for offset in range(search):
+        for y in (target - offset, target + offset):
+            if 0 < y < gray.height and gray.crop((0, y, gray.width, y + 1)).getextrema()[0] > 200:
+                return y
+    return target
+
+
+class ExtractionEngine:
+    """Parallel text extraction over a process pool.
+
+    PDFs are split into page ranges and scanned images into horizontal tiles
+    that are processed on all cores. Each file has a timeout and each worker
+    an address-space cap (EXTRACT_WORKER_MAX_MB).
+
+    A timeout kills the pool's workers, so a runaway file stops using CPU
+    and memory; a crashed worker breaks the pool. In both cases the pool is
+    discarded and rebuilt on the next call, and files that were running
+    alongside on the old pool are retried once on the new one.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+        self.timeout = float(os.getenv("EXTRACT_TIMEOUT", "300"))
+        self.worker_max_mb = int(os.getenv("EXTRACT_WORKER_MAX_MB", "1024"))
+        self.tile_height = int(os.getenv("EXTRACT_OCR_TILE_HEIGHT", "1200"))
+        self.ocr_pdf = os.getenv("EXTRACT_OCR_PDF", "true").lower() == "true"
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"files": 0, "pages": 0, "seconds": 0.0, "timeouts": 0, "pool_restarts": 0}
+        self._last_pages_per_sec = 0.0
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    # spawn: the API process holds threads (ONNX, HTTP clients)
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_limit_worker_memory,
+                    initargs=(self.worker_max_mb,),
+                    # Recycle workers so leaked OCR/PDF memory is returned
+                    max_tasks_per_child=50,
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _discard(self, pool: ProcessPoolExecutor, kill: bool = False) -> None:
+        """Drops `pool` (if still current) so the next call builds a new one.
+
+        With `kill`, its worker processes are terminated first: cancelling a
+        future does not stop a task that is already running.
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self._stats["pool_restarts"] += 1
+        if kill:
+            # No public API for this before Python 3.14 (terminate_workers)
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, content: bytes, ext: str) -> str:
+        return "\n".join(self.extract_pages(content, ext))
+
+    def extract_pages(self, content: bytes, ext: str) -> List[str]:
+        """Text per page for PDFs; a single-element list for other types."""
+        start = time.perf_counter()
+        if ext in PDF_EXTENSIONS:
+            parts = self._extract_pdf(content)
+        elif ext in DOCX_EXTENSIONS:
+            parts = self._run([(_extract_docx, (content,))])
+        elif ext in IMAGE_EXTENSIONS:
+            parts = ["\n".join(self._extract_image(content))]
+        elif ext in TXT_EXTENSIONS:
+            parts = [content.decode("utf-8")]
+        else:
+            raise ValueError(f"Unsupported file type: {ext}")
+        elapsed = time.perf_counter() - start
+
+        pages = len(parts) if ext in PDF_EXTENSIONS else 1
+        self._record(pages, elapsed)
+        logger.info(
+            f"Extracted {pages} page(s) from .{ext} in {elapsed:.2f}s "
+            f"({pages / elapsed if elapsed else 0:.1f} pages/s)"
+        )
+        return parts
+
+    def _extract_pdf(self, content: bytes) -> List[str]:
+        total = len(pypdf.PdfReader(io.BytesIO(content)).pages)
+        if total == 0:
+            return []
+        # A few ranges per worker keeps the pool busy without re-parsing too often
+        step = max(1, -(-total // (max(1, self.max_workers) * 4)))
+        tasks = [
+            (_extract_pdf_pages, (content, i, min(i + step, total), self.ocr_pdf))
+            for i in range(0, total, step)
+        ]
+        return [page for pages in self._run(tasks) for page in pages]
+
+    def _extract_image(self, content: bytes) -> List[str]:
+        gray = Image.open(io.BytesIO(content)).convert("L")
+        cuts = [0]
+        while gray.height - cuts[-1] > self.tile_height * 1.5:
+            cuts.append(_blank_row_near(gray, cuts[-1] + self.tile_height, self.tile_height // 10))
+        cuts.append(gray.height)
+        tasks = [(_ocr_tile, (content, top, bottom)) for top, bottom in zip(cuts, cuts[1:])]
+        return self._run(tasks)
+
+    def _run(self, tasks: List[Tuple], retries: int = 1) -> List:
+        """Runs (fn, args) tasks on the pool; results in task order."""
+        if self.max_workers <= 0:
+            # EXTRACT_WORKERS=0: extract inline on the calling thread
+            return [fn(*args) for fn, args in tasks]
+        pool = self.pool
+        try:
+            try:
+                futures = [pool.submit(fn, *args) for fn, args in tasks]
+            except RuntimeError as e:
+                # Broken, or discarded by another file since we fetched it
+                raise BrokenProcessPool(str(e)) from e
+            done, not_done = wait(futures, timeout=self.timeout)
+            if not_done:
+                self._discard(pool, kill=True)
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise TimeoutError(f"Extraction exceeded {self.timeout:.0f}s")
+            return [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            # A worker died: this file's, or one of another file on the same pool
+            self._discard(pool)
+            if retries > 0:
+                logger.warning("Extraction pool broken; retrying on a new pool")
+                return self._run(tasks, retries - 1)
+            raise ExtractionError(
+                "Extraction worker crashed (out of memory or malformed file)"
+            ) from e
+
+    def _record(self, pages: int, elapsed: float) -> None:
+        with self._lock:
+            self._stats["files"] += 1
+            self._stats["pages"] += pages
+            self._stats["seconds"] += elapsed
+            self._last_pages_per_sec = pages / elapsed if elapsed else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            seconds = self._stats["seconds"]
+            return {
+                **self._stats,
+                "seconds": round(seconds, 3),
+                "pages_per_sec": round(self._stats["pages"] / seconds, 2) if seconds else 0.0,
+                "last_pages_per_sec": round(self._last_pages_per_sec, 2),
+                "workers": self.max_workers,
+            }
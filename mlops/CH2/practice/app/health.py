@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from metrics import BREAKER_STATE, BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Per-dependency circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    `allow()` returns False, so callers fail fast. Once `reset_timeout` has
+    passed, a single trial call is let through (half-open): success closes
+    the breaker, failure re-opens it with the timeout doubled, up to
+    `max_reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 5.0,
+        max_reset_timeout: float = 60.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+        BREAKER_STATE.labels(name).set(0)
+
+    @classmethod
+    def from_env(cls, name: str) -> "CircuitBreaker":
+        return cls(
+            name,
+            failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("BREAKER_RESET_TIMEOUT", "5")),
+            max_reset_timeout=float(os.getenv("BREAKER_MAX_RESET_TIMEOUT", "60")),
+        )
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the next trial call is allowed (0 if not open)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected (no side effects, unlike allow)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                return True
+            return self.state == OPEN and time.monotonic() < self.opened_at + self.reset_timeout
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.opened_at + self.reset_timeout:
+                self._transition(HALF_OPEN)
+                return True
+            # Open, or half-open with the trial call still in flight
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self.reset_timeout = self.base_reset_timeout
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def release(self) -> None:
+        """Gives back an unfinished half-open trial (e.g. the caller was cancelled)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # Still open, but the next call is allowed to try again
+                self.opened_at = time.monotonic() - self.reset_timeout
+                self._transition(OPEN)
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        BREAKER_STATE.labels(self.name).set(_STATE_VALUES[state])
+        BREAKER_TRANSITIONS.labels(self.name, state).inc()
+
+    def stats(self) -> Dict:
+        retry_after = self.retry_after
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "reset_timeout_s": self.reset_timeout,
+                "retry_after_s": round(retry_after, 1),
+            }
+
+
+class HealthMonitor:
+    """Probes dependencies in the background and caches the result.
+
+    /health reads `status` instead of hitting Qdrant and the LLM on every
+    request. Each probe goes through the dependency's breaker: while it is
+    open the probe is skipped, and once the reset timeout has passed the
+    probe itself is the half-open trial.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))
+        self.probes: Dict[str, tuple] = {}
+        self.status: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(
+        self, name: str, probe: Callable[[], Awaitable[bool]], breaker: CircuitBreaker
+    ) -> None:
+        self.probes[name] = (probe, breaker)
+        self.status[name] = {"status": "unknown", "checked_at": None}
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._probe(name) for name in self.probes))
+
+    async def _probe(self, name: str) -> None:
+        probe, breaker = self.probes[name]
+        if not breaker.allow():
+            self.status[name] = {"status": "offline", "checked_at": time.time()}
+            return
+        try:
+            ok = await probe()
+        except Exception as e:
+            logger.warning(f"Health probe {name} failed: {e}")
+            ok = False
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        self.status[name] = {"status": "online" if ok else "offline", "checked_at": time.time()}
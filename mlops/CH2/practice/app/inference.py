@@ -0,0 +1,431 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from health import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceError(Exception):
+    pass
+
+
+class _Batcher:
+    """Merges concurrent requests for one model into a single call.
+
+    The first waiting request opens a batch; requests arriving within
+    `max_wait` seconds join it until `max_batch` items are collected. `run`
+    maps a list of items to an equally long sequence of results, which is
+    split back per request.
+    """
+
+    def __init__(self, name: str, run: Callable, max_batch: int, max_wait: float):
+        self.name = name
+        self.run = run
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue: "queue.Queue[tuple]" = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+
+    def submit(self, items: List, reply: Callable[[bool, object], None]) -> None:
+        self.queue.put((items, reply))
+
+    def run_forever(self) -> None:
+        while True:
+            requests = [self.queue.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+
+            flat = [item for items, _ in requests for item in items]
+            try:
+                results = self.run(flat)
+            except Exception as e:
+                logger.error(f"Inference batch {self.name} failed: {e}")
+                for _, reply in requests:
+                    reply(False, f"{type(e).__name__}: {e}")
+                continue
+
+            self.batches += 1
+            self.items += len(flat)
+            self.requests += len(requests)
+            offset = 0
+            for items, reply in requests:
+                reply(True, results[offset : offset + len(items)])
+                offset += len(items)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_items": round(self.items / self.batches, 1) if self.batches else 0.0,
+            "queued": self.queue.qsize(),
+        }
+
+
+class InferenceServer:
+    """Serves the dense embedder and the cross-encoder to every API worker.
+
+    Listens on a Unix socket (multiprocessing.connection, HMAC-authenticated
+    with `authkey`). Each request is `(request_id, op, payload)` with op
+    `embed` (list of texts -> float32 matrix), `rerank` (list of (query, doc)
+    pairs -> scores) or `stats`; replies are `(request_id, ok, result)` and
+    may arrive out of order. Concurrent requests are batched per model.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        authkey: bytes,
+        embedder,
+        reranker=None,
+        max_batch: int = 64,
+        max_wait_ms: float = 5,
+    ):
+        self.address = address
+        self.authkey = authkey
+        self.batchers = {
+            "embed": _Batcher(
+                "embed",
+                lambda texts: np.stack(list(embedder.embed(texts, batch_size=max_batch))),
+                max_batch,
+                max_wait_ms / 1000,
+            )
+        }
+        if reranker is not None:
+            self.batchers["rerank"] = _Batcher(
+                "rerank",
+                lambda pairs: np.fromiter(
+                    reranker.rerank_pairs(pairs, batch_size=max_batch), dtype=np.float32
+                ),
+                max_batch,
+                max_wait_ms / 1000,
+            )
+        self.connections = 0
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        for batcher in self.batchers.values():
+            threading.Thread(target=batcher.run_forever, daemon=True).start()
+        logger.info(f"Inference server listening on {self.address} (pid {os.getpid()})")
+
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+                logger.warning(f"Rejected inference connection: {e}")
+                continue
+            self.connections += 1
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn) -> None:
+        send_lock = threading.Lock()
+
+        def reply_to(request_id: int) -> Callable[[bool, object], None]:
+            def reply(ok: bool, result) -> None:
+                with send_lock:
+                    try:
+                        conn.send((request_id, ok, result))
+                    except (OSError, EOFError):
+                        pass  # The worker went away; nothing to answer to
+
+            return reply
+
+        try:
+            while True:
+                request_id, op, payload = conn.recv()
+                if op == "stats":
+                    reply_to(request_id)(True, self.stats())
+                elif op in self.batchers:
+                    self.batchers[op].submit(payload, reply_to(request_id))
+                else:
+                    reply_to(request_id)(False, f"Unknown operation: {op}")
+        except (OSError, EOFError):
+            pass
+        finally:
+            self.connections -= 1
+            conn.close()
+
+    def stats(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "connections": self.connections,
+            **{op: batcher.stats() for op, batcher in self.batchers.items()},
+        }
+
+
+def run_server(address: str, authkey: bytes) -> None:
+    """Loads the models, runs them once and serves them (blocking)."""
+    logging.basicConfig(level=logging.INFO)
+    from fastembed import TextEmbedding
+    from rerank import Reranker
+    from services import DENSE_MODEL, model_kwargs
+
+    start = time.perf_counter()
+    embedder = TextEmbedding(model_name=DENSE_MODEL, **model_kwargs())
+    reranker = Reranker(**model_kwargs()).model
+    # Load the ONNX sessions before accepting connections
+    list(embedder.embed(["warm-up"]))
+    if reranker is not None:
+        list(reranker.rerank("warm-up", ["warm-up"]))
+    logger.info(f"Inference models ready in {time.perf_counter() - start:.1f}s")
+
+    InferenceServer(
+        address,
+        authkey,
+        embedder,
+        reranker,
+        max_batch=int(os.getenv("INFERENCE_MAX_BATCH", "64")),
+        max_wait_ms=float(os.getenv("INFERENCE_MAX_WAIT_MS", "5")),
+    ).serve_forever()
+
+
+class InferenceProcess:
+    """Runs `run_server` in a child process and restarts it if it dies.
+
+    `start` returns once the server is listening, i.e. once the models are
+    loaded, so the API workers started afterwards never see it missing.
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.process: Optional[multiprocessing.Process] = None
+        self._stopping = False
+
+    def start(self, timeout: float = 600) -> None:
+        self._spawn()
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(self.address):
+            if not self.process.is_alive():
+                raise RuntimeError(f"Inference server exited with code {self.process.exitcode}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Inference server not listening after {timeout:.0f}s")
+            time.sleep(0.2)
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=10)
+
+    def _spawn(self) -> None:
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # Stale socket from a previous run
+        # spawn: ONNX Runtime's thread pools do not survive fork()
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(
+            target=run_server, args=(self.address, self.authkey), name="inference", daemon=True
+        )
+        self.process.start()
+
+    def _watch(self) -> None:
+        while True:
+            self.process.join()
+            if self._stopping:
+                return
+            logger.error(
+                f"Inference server exited with code {self.process.exitcode}; restarting"
+            )
+            time.sleep(1)
+            self._spawn()
+
+
+class InferenceClient:
+    """Connection from an API worker to the InferenceServer.
+
+    Thread-safe: calls from any thread share one connection and are matched
+    to their replies by request id, so concurrent requests from the same
+    worker can land in the same server batch. A lost connection fails the
+    calls in flight and is re-opened on the next call.
+
+    Calls go through `breaker`: while the server is unreachable they fail
+    fast with CircuitOpenError instead of each waiting `connect_timeout`.
+    Connecting happens outside the lock, so it never blocks calls that
+    already have a connection.
+    """
+
+    def __init__(
+        self, address: str, authkey: bytes, timeout: float = 60, connect_timeout: float = 30
+    ):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.breaker = CircuitBreaker.from_env("inference")
+        self.last_stats: Dict = {}
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending: Dict[int, tuple] = {}  # request_id -> (connection, future)
+        self._ids = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> Optional["InferenceClient"]:
+        """Client for the shared server when INFERENCE_SHARED=true, else None."""
+        if os.getenv("INFERENCE_SHARED", "false").lower() != "true":
+            return None
+        return cls(
+            os.getenv("INFERENCE_SOCKET", "/tmp/rag-inference.sock"),
+            os.getenv("INFERENCE_AUTHKEY", "").encode(),
+            timeout=float(os.getenv("INFERENCE_TIMEOUT", "60")),
+        )
+
+    def _connect(self):
+        # The server may be restarting: retry for a while before failing
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                if time.monotonic() > deadline:
+                    raise ConnectionError(f"Inference server unavailable at {self.address}") from e
+                time.sleep(0.2)
+
+    def _connection(self):
+        """The shared connection, opened (without holding the lock) if needed."""
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+        conn = self._connect()
+        with self._lock:
+            if self._conn is None:
+                self._conn = conn
+                threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+                logger.info(f"Connected to inference server at {self.address}")
+                return conn
+            current = self._conn  # Another thread connected meanwhile
+        conn.close()
+        return current
+
+    def _read(self, conn) -> None:
+        try:
+            while True:
+                request_id, ok, result = conn.recv()
+                _, future = self._pending.pop(request_id, (None, None))
+                if future is None:
+                    continue  # The caller already timed out
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(InferenceError(result))
+        except (OSError, EOFError):
+            with self._lock:
+                if self._conn is conn:
+                    self._conn = None
+                lost = [rid for rid, (c, _) in self._pending.items() if c is conn]
+                pending = [self._pending.pop(rid)[1] for rid in lost]
+            for future in pending:
+                future.set_exception(ConnectionError("Inference server connection lost"))
+
+    def call(self, op: str, payload):
+        if not self.breaker.allow():
+            raise CircuitOpenError("Inference server unavailable (circuit open)")
+        try:
+            result = self._request(op, payload)
+        except InferenceError:
+            # The server answered (e.g. a model error): it is up
+            self.breaker.record_success()
+            raise
+        except (ConnectionError, FutureTimeoutError):
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _request(self, op: str, payload):
+        future: Future = Future()
+        conn = self._connection()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = (conn, future)
+            try:
+                conn.send((request_id, op, payload))
+            except (OSError, EOFError) as e:
+                self._pending.pop(request_id, None)
+                if self._conn is conn:
+                    self._conn = None
+                raise ConnectionError("Inference server connection lost") from e
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._pending.pop(request_id, None)
+            raise
+
+    def check_health(self) -> bool:
+        """Health probe: fetches the server stats (kept in `last_stats`).
+
+        Bypasses the breaker: the HealthMonitor already checked it, and the
+        probe is what closes it again.
+        """
+        try:
+            self.last_stats = self._request("stats", None)
+            return True
+        except Exception:
+            return False
+
+
+class RemoteTextEmbedding:
+    """Stands in for fastembed's TextEmbedding, served by the InferenceServer."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def embed(self, documents, batch_size: Optional[int] = None, **kwargs) -> Iterator[np.ndarray]:
+        documents = [documents] if isinstance(documents, str) else list(documents)
+        if not documents:
+            return iter([])
+        return iter(self.client.call("embed", documents))
+
+    # bge-small-en-v1.5 embeds queries and documents the same way
+    query_embed = embed
+
+
+class RemoteCrossEncoder:
+    """Stands in for fastembed's TextCrossEncoder, served by the InferenceServer."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def rerank(self, query: str, documents, batch_size: Optional[int] = None, **kwargs):
+        pairs = [(query, doc) for doc in documents]
+        if not pairs:
+            return iter([])
+        return iter(self.client.call("rerank", pairs).tolist())
+
+
+if __name__ == "__main__":
+    # Standalone server: start the API with INFERENCE_SHARED=true and the
+    # same INFERENCE_SOCKET / INFERENCE_AUTHKEY
+    run_server(
+        os.getenv("INFERENCE_SOCKET", "/tmp/rag-inference.sock"),
+        os.getenv("INFERENCE_AUTHKEY", "").encode(),
+    )
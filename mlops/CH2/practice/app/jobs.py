@@ -0,0 +1,199 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from metrics import (
+    INGEST_JOB_SECONDS,
+    INGEST_JOB_WAIT_SECONDS,
+    INGEST_JOBS_RUNNING,
+    INGEST_QUEUE_DEPTH,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class IngestJobQueue:
+    """Bounded background queue for file ingestion.
+
+    `submit` enqueues the raw upload and returns a job id right away; a fixed
+    number of asyncio workers run `handler(content, filename, on_progress)` in
+    a thread; the handler returns (inserted, skipped) chunk counts. When `max_queued` jobs are waiting, `submit` raises
+    QueueFullError so the API can push back on the client. Optional
+    `metadata` is passed on to the handler as `metadata=`.
+
+    With several API workers a poll may reach a worker other than the one
+    running the job: with `state_dir` every job is also written there as
+    `<job_id>.json`, and `get` falls back to that file.
+    """
+
+    def __init__(
+        self,
+        handler: Callable,
+        workers: int = 2,
+        max_queued: int = 100,
+        history: int = 1000,
+        state_dir: Optional[str] = None,
+    ):
+        self.handler = handler
+        self.state_dir = state_dir
+        self.workers = workers
+        self.history = history
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queued)
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._payloads: Dict[str, tuple] = {}  # job_id -> (content, metadata)
+        self._tasks: List[asyncio.Task] = []
+        self._latencies: List[float] = []
+
+    INTERRUPTED = "Interrupted by API shutdown"
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs that never started: finished as failed, so pollers stop waiting
+        for job_id in list(self._payloads):
+            job = self.jobs[job_id]
+            job.update(state="failed", error=self.INTERRUPTED, finished_at=time.time())
+            self._save(job)
+        self._payloads.clear()
+        INGEST_QUEUE_DEPTH.set(0)
+
+    def submit(self, content: bytes, filename: str, metadata: Optional[Dict] = None) -> Dict:
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "filename": filename,
+            **(metadata or {}),
+            "state": "queued",
+            "chunks_processed": 0,
+            "chunks_inserted": 0,
+            "chunks_skipped": 0,
+            "chunks_total": None,
+            "error": None,
+            "queued_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        if self.queue.full():
+            raise QueueFullError(f"Ingestion queue is full ({self.queue.maxsize} jobs)")
+        self._payloads[job_id] = (content, metadata)
+        self.jobs[job_id] = job
+        self.queue.put_nowait(job_id)
+        INGEST_QUEUE_DEPTH.set(self.queue.qsize())
+        self._save(job)
+        self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        if job is not None or not self.state_dir:
+            return job
+        try:
+            with open(self._state_path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _state_path(self, job_id: str) -> str:
+        # Job ids are uuid hex; anything else cannot name a state file
+        return os.path.join(self.state_dir, f"{os.path.basename(job_id)}.json")
+
+    def _save(self, job: Dict) -> None:
+        if not self.state_dir:
+            return
+        path = self._state_path(job["job_id"])
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(job, f)
+            os.replace(tmp, path)  # Readers never see a partial file
+        except OSError as e:
+            logger.warning(f"Could not save state of job {job['job_id']}: {e}")
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self.queue.get()
+            INGEST_QUEUE_DEPTH.set(self.queue.qsize())
+            INGEST_JOBS_RUNNING.inc()
+            job = self.jobs[job_id]
+            content, metadata = self._payloads.pop(job_id)
+            job["state"] = "running"
+            job["started_at"] = time.time()
+            INGEST_JOB_WAIT_SECONDS.observe(job["started_at"] - job["queued_at"])
+            self._save(job)
+
+            def on_progress(done: int, total: int, job=job) -> None:
+                job["chunks_processed"] = done
+                job["chunks_total"] = total
+                self._save(job)
+
+            try:
+                inserted, skipped = await asyncio.to_thread(
+                    self.handler, content, job["filename"], on_progress, metadata=metadata
+                )
+                job["chunks_inserted"] = inserted
+                job["chunks_skipped"] = skipped
+                job["chunks_processed"] = job["chunks_total"] = inserted + skipped
+                job["state"] = "succeeded"
+            except asyncio.CancelledError:
+                job["state"] = "failed"
+                job["error"] = self.INTERRUPTED
+                raise
+            except Exception as e:
+                logger.error(f"Ingest job {job_id} ({job['filename']}) failed: {e}")
+                job["state"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = time.time()
+                self._save(job)
+                INGEST_JOBS_RUNNING.dec()
+                latency = job["finished_at"] - job["queued_at"]
+                if job["error"] != self.INTERRUPTED:  # shutdown says nothing about latency
+                    INGEST_JOB_SECONDS.labels(job["state"]).observe(latency)
+                self._latencies.append(latency)
+                self._latencies = self._latencies[-self.history :]
+                self.queue.task_done()
+
+    def _trim_history(self) -> None:
+        # Forget the oldest finished jobs; queued/running ones are always kept
+        excess = len(self.jobs) - self.history
+        if excess <= 0:
+            return
+        for job_id in [j for j, job in self.jobs.items() if job["finished_at"]][:excess]:
+            del self.jobs[job_id]
+            if self.state_dir:
+                try:
+                    os.unlink(self._state_path(job_id))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict:
+        states: Dict[str, int] = {}
+        for job in self.jobs.values():
+            states[job["state"]] = states.get(job["state"], 0) + 1
+        latencies = sorted(self._latencies)
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queued": self.queue.maxsize,
+            "workers": self.workers,
+            "states": states,
+            "latency_avg_s": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "latency_p95_s": round(
+                latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3
+            )
+            if latencies
+            else 0.0,
+        }
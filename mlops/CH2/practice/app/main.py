@@ -1,17 +1,41 @@
+import asyncio
+import json
 import logging
+import os
+import time
 from contextlib import asynccontextmanager
+from typing import Dict, Optional
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from extraction import SUPPORTED_EXTENSIONS
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from health import CircuitBreaker, CircuitOpenError
+from jobs import IngestJobQueue, QueueFullError
+from metrics import (
+    IN_FLIGHT,
+    REGISTRY,
+    REQUEST_SECONDS,
+    CacheCollector,
+    mark_worker_exit,
+    render,
+)
+from prometheus_client import CONTENT_TYPE_LATEST
 from schemas import (
     AskRequest,
     AskResponse,
+    BatchAskRequest,
+    BatchAskResponse,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    IngestJob,
     IngestRequest,
     IngestResponse,
     SearchRequest,
+    SearchFilters,
     SearchResponse,
 )
-from services import OrchestratorService, seed_database
+from services import OrchestratorService
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -19,22 +43,43 @@ logger = logging.getLogger("app")
 
 # Global Service
 orchestrator = None
+ingest_jobs = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global orchestrator
+    global orchestrator, ingest_jobs
     logger.info("Startup: Initializing Services...")
 
-    # Initialize implementation
+    # Initialize implementation (models are resolved but not loaded yet)
     orchestrator = OrchestratorService()
 
-    # Run Seeder
-    # Note: embedder model download might happen here
-    seed_database(orchestrator.vector_db)
+    # Load models + seed in the background; /health answers right away
+    warm_up = asyncio.create_task(asyncio.to_thread(orchestrator.warm_up))
+
+    # Shared HTTP connection pool for the LLM backend
+    await orchestrator.llm_service.start()
+
+    # Dependency probes + circuit breakers
+    orchestrator.health.start()
+
+    # Background file ingestion
+    ingest_jobs = IngestJobQueue(
+        orchestrator.process_and_ingest_file,
+        workers=int(os.getenv("INGEST_JOB_WORKERS", "2")),
+        max_queued=int(os.getenv("INGEST_JOB_QUEUE_SIZE", "100")),
+        state_dir=os.getenv("INGEST_JOB_STATE_DIR") or None,
+    )
+    ingest_jobs.start()
 
     yield
     logger.info("Shutdown: Cleaning up...")
+    warm_up.cancel()
+    await orchestrator.health.stop()
+    await ingest_jobs.stop()
+    await orchestrator.llm_service.close()
+    orchestrator.extractor.shutdown()
+    mark_worker_exit()
 
 
 app = FastAPI(title="Medical RAG (Edu)", version="3.0", lifespan=lifespan)
@@ -47,76 +92,299 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+REGISTRY.register(
+    CacheCollector(lambda: orchestrator.get_cache_stats() if orchestrator else {})
+)
+
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        # Route template (e.g. /jobs/{job_id}) keeps the label cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(
+            route.path if route else "unmatched", str(status)
+        ).observe(time.perf_counter() - start)
+
+
+def require_ready():
+    if not orchestrator or not orchestrator.ready:
+        raise HTTPException(
+            status_code=503, detail="Warming up", headers={"Retry-After": "5"}
+        )
+
+
+def unavailable(breaker: CircuitBreaker, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(max(1, round(breaker.retry_after)))},
+    )
+
+
+def require_llm():
+    """Fails fast with 503 while the LLM circuit breaker is open."""
+    breaker = orchestrator.llm_service.breaker
+    if breaker.is_open:
+        raise unavailable(breaker, "LLM indisponível, tente novamente em instantes")
+
+
+def require_vector_db():
+    """Fails fast with 503 while the Qdrant circuit breaker is open.
+
+    Without it, /search would answer 200 with no results and /ask would
+    answer without context.
+    """
+    breaker = orchestrator.vector_db.breaker
+    if breaker.is_open:
+        raise unavailable(breaker, "Banco vetorial indisponível, tente novamente em instantes")
+
+
+def filters_dict(filters: Optional[SearchFilters]) -> Optional[Dict]:
+    return filters.model_dump(exclude_none=True) if filters else None
+
 
 @app.get("/health")
-def health():
+async def health():
     if not orchestrator:
         raise HTTPException(status_code=503, detail="Initializing")
     
-    # Granular health check
+    # Cached by the background probes: no dependency calls here
     health_status = orchestrator.get_health()
     return {
-        "status": "ok", 
+        "status": "ok" if orchestrator.ready else "starting",
+        "startup": orchestrator.startup,
         "mode": "edu",
         "services": {
             "api": "online",
             **health_status
-        }
+        },
+        "caches": orchestrator.get_cache_stats(),
+        "extraction": orchestrator.extractor.stats(),
+        "ingest_jobs": ingest_jobs.stats(),
+        "rerank": orchestrator.reranker.stats(),
+        "circuit_breakers": orchestrator.get_breaker_stats(),
+        "collection_profile": orchestrator.vector_db.profile.describe(),
+        "worker_pid": os.getpid(),
+        "inference": orchestrator.get_inference_stats(),
     }
 
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the models are loaded, 503 before."""
+    require_ready()
+    return {"status": "ready", "startup": orchestrator.startup}
+
+
 @app.post("/ingest", response_model=IngestResponse)
 def ingest(request: IngestRequest):
+    require_ready()
     try:
-        count = orchestrator.vector_db.ingest(request.texts, request.source)
+        inserted, skipped = orchestrator.vector_db.ingest(
+            request.texts,
+            request.source,
+            metadata={"specialty": request.specialty, "document_id": request.document_id},
+        )
         return IngestResponse(
-            collection=orchestrator.vector_db.collection_name, inserted=count
+            collection=orchestrator.vector_db.collection_name,
+            inserted=inserted,
+            skipped=skipped,
         )
     except Exception as e:
         logger.error(f"Ingest failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/ingest-file")
-async def ingest_file(file: UploadFile = File(...)):
+@app.post("/ingest-file", response_model=IngestJob, status_code=202)
+async def ingest_file(
+    file: UploadFile = File(...), specialty: Optional[str] = Form(None)
+):
+    """Queues the file for background ingestion; poll /jobs/{job_id}."""
+    require_ready()
+    ext = file.filename.split(".")[-1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
     try:
         content = await file.read()
-        count = orchestrator.process_and_ingest_file(content, file.filename)
-        return {
-            "filename": file.filename,
-            "inserted_chunks": count,
-            "status": "success",
-        }
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"File ingest failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        metadata = {"specialty": specialty} if specialty else None
+        return ingest_jobs.submit(content, file.filename, metadata)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+@app.get("/jobs/{job_id}", response_model=IngestJob)
+def get_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @app.post("/search", response_model=SearchResponse)
 def search(request: SearchRequest):
-    results = orchestrator.vector_db.search(request.query, request.top_k)
+    require_ready()
+    require_vector_db()
+    results = orchestrator.vector_db.search(
+        request.query, request.top_k, request.mode, filters_dict(request.filters)
+    )
     return SearchResponse(results=results)
 
 
 @app.post("/ask", response_model=AskResponse)
-def ask(request: AskRequest):
+async def ask(request: AskRequest):
+    require_ready()
+    require_vector_db()
+    require_llm()
     try:
-        answer, docs, debug_texts, debug_prompt = orchestrator.ask(request.question)
+        answer, docs, debug_prompt, prompt_tokens = await orchestrator.ask(
+            request.question,
+            request.top_k,
+            request.mode,
+            request.rerank,
+            filters_dict(request.filters),
+            request.debug,
+        )
 
         return AskResponse(
             answer=answer,
             context=docs,
             retrieved_docs=docs,
-            built_prompt=debug_prompt
+            built_prompt=debug_prompt,
+            prompt_tokens=prompt_tokens,
         )
     except Exception as e:
         logger.error(f"Error generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/search/batch", response_model=BatchSearchResponse)
+def search_batch(request: BatchSearchRequest):
+    require_ready()
+    require_vector_db()
+    try:
+        results = orchestrator.vector_db.search_batch(
+            request.queries, request.top_k, request.mode, filters_dict(request.filters)
+        )
+        return BatchSearchResponse(results=results)
+    except CircuitOpenError:
+        # Opened (or its half-open trial taken) since require_vector_db
+        raise unavailable(
+            orchestrator.vector_db.breaker,
+            "Banco vetorial indisponível, tente novamente em instantes",
+        )
+    except Exception as e:
+        logger.error(f"Batch search failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/ask/batch", response_model=BatchAskResponse)
+async def ask_batch(request: BatchAskRequest):
+    require_ready()
+    require_vector_db()
+    require_llm()
+    results = await orchestrator.ask_batch(
+        request.questions,
+        request.top_k,
+        request.mode,
+        request.rerank,
+        filters_dict(request.filters),
+        request.debug,
+    )
+    return BatchAskResponse(results=results)
+
+
+@app.post("/ask/stream")
+async def ask_stream(request: AskRequest):
+    """Server-Sent Events: `docs`, then `token`*, then `done` (or `error`)."""
+    require_ready()
+    require_vector_db()
+    require_llm()
+
+    async def event_source():
+        async for event, data in orchestrator.ask_stream(
+            request.question,
+            request.top_k,
+            request.mode,
+            request.rerank,
+            filters_dict(request.filters),
+            request.debug,
+        ):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        # Tell nginx not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def run_workers(workers: int, port: int) -> None:
+    """Multi-worker mode: N uvicorn workers + one shared inference process.
+
+    The dense embedder and the re-ranker are loaded once, in the inference
+    process; workers send it their texts over a Unix socket. The settings
+    below are exported before the workers are spawned, so they inherit them.
+    """
+    import glob
+    import secrets
+    import tempfile
+
+    import uvicorn
+    from inference import InferenceProcess
+
+    os.environ["INFERENCE_SHARED"] = "true"
+    os.environ["INFERENCE_SOCKET"] = os.getenv("INFERENCE_SOCKET") or "/tmp/rag-inference.sock"
+    os.environ["INFERENCE_AUTHKEY"] = os.getenv("INFERENCE_AUTHKEY") or secrets.token_hex(16)
+    # Job state shared by the workers (a poll may reach any of them)
+    os.environ["INGEST_JOB_STATE_DIR"] = os.getenv("INGEST_JOB_STATE_DIR") or tempfile.mkdtemp(
+        prefix="rag-jobs-"
+    )
+    # Prometheus multi-process mode; old values would be summed in, so start clean
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="rag-metrics-")
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    inference = InferenceProcess(
+        os.environ["INFERENCE_SOCKET"], os.environ["INFERENCE_AUTHKEY"].encode()
+    )
+    logger.info("Starting the shared inference server...")
+    inference.start(timeout=float(os.getenv("INFERENCE_START_TIMEOUT", "600")))
+    logger.info(f"Starting {workers} API workers")
+    try:
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    finally:
+        inference.stop()
+
+
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = int(os.getenv("API_WORKERS", "1"))
+    port = int(os.getenv("API_PORT", "8000"))
+    if workers > 1 and os.getenv("QDRANT_HOST") == ":memory:":
+        # Every worker would get its own private, empty Qdrant
+        raise SystemExit(
+            "API_WORKERS > 1 requires a Qdrant server (QDRANT_HOST=:memory: is per process)"
+        )
+    if workers > 1:
+        run_workers(workers, port)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,153 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Dedicated registry: only what the RAG pipeline records is exported.
+# With several API workers (PROMETHEUS_MULTIPROC_DIR set by main.py) every
+# worker writes its values to that directory and /metrics aggregates them.
+REGISTRY = CollectorRegistry()
+
+# Embedding / LLM latencies span milliseconds to minutes
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent per pipeline stage (embed, search, rerank, prompt_build, llm, total)",
+    ["stage"],
+    buckets=_BUCKETS,
+    registry=REGISTRY,
+)
+REQUEST_SECONDS = Histogram(
+    "rag_http_request_duration_seconds",
+    "HTTP request latency per route (for streams: until the headers are sent)",
+    ["route", "status"],
+    buckets=_BUCKETS,
+    registry=REGISTRY,
+)
+IN_FLIGHT = Gauge(
+    "rag_http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+DEPENDENCY_ERRORS = Counter(
+    "rag_dependency_errors_total",
+    "Failed calls per dependency (qdrant, embedder, llm)",
+    ["dependency"],
+    registry=REGISTRY,
+)
+INGESTED_CHUNKS = Counter(
+    "rag_ingested_chunks_total",
+    "Chunks handled by ingest, by outcome (inserted, skipped, updated)",
+    ["outcome"],
+    registry=REGISTRY,
+)
+TTFT_SECONDS = Histogram(
+    "rag_llm_ttft_seconds",
+    "Time from the /ask/stream request to its first answer token, by source (llm, cache)",
+    ["source"],
+    buckets=_BUCKETS,
+    registry=REGISTRY,
+)
+INGEST_QUEUE_DEPTH = Gauge(
+    "rag_ingest_jobs_queued",
+    "Ingest jobs waiting for a worker",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+INGEST_JOBS_RUNNING = Gauge(
+    "rag_ingest_jobs_running",
+    "Ingest jobs being processed",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+INGEST_JOB_WAIT_SECONDS = Histogram(
+    "rag_ingest_job_wait_seconds",
+    "Time ingest jobs spent queued before a worker picked them up",
+    buckets=_BUCKETS + (300, 600, 1800),
+    registry=REGISTRY,
+)
+INGEST_JOB_SECONDS = Histogram(
+    "rag_ingest_job_duration_seconds",
+    "Ingest job latency from submit to finish, by final state (succeeded, failed)",
+    ["state"],
+    buckets=_BUCKETS + (300, 600, 1800),
+    registry=REGISTRY,
+)
+PROMPT_TOKENS = Histogram(
+    "rag_prompt_tokens",
+    "Prompt tokens sent to the LLM per request (after the context budget)",
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 4096),
+    registry=REGISTRY,
+)
+BREAKER_STATE = Gauge(
+    "rag_circuit_breaker_state",
+    "Circuit breaker state per dependency (0=closed, 1=half-open, 2=open)",
+    ["dependency"],
+    multiprocess_mode="livemax",
+    registry=REGISTRY,
+)
+BREAKER_TRANSITIONS = Counter(
+    "rag_circuit_breaker_transitions",
+    "Circuit breaker state changes, by the state entered",
+    ["dependency", "state"],
+    registry=REGISTRY,
+)
+
+
+def render() -> bytes:
+    """Exposition text for /metrics (aggregated over workers if multi-process)."""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_worker_exit() -> None:
+    """Drops this worker's live gauges from the multi-process aggregation."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+@contextmanager
+def timed(stage: str):
+    """Observes the duration of the block in rag_stage_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+class CacheCollector:
+    """Exports the caches' own hit/miss counters at scrape time.
+
+    The caches already count lookups under their lock, so nothing extra is
+    recorded on the request path. `source` returns {cache_name: stats()}.
+    Caches are per process, so in multi-worker mode they are only reported
+    on /health (by the worker that answers).
+    """
+
+    def __init__(self, source: Callable[[], Dict[str, Dict]]):
+        self.source = source
+
+    def collect(self):
+        lookups = CounterMetricFamily(
+            "rag_cache_lookups", "Cache lookups by result", labels=["cache", "result"]
+        )
+        evictions = CounterMetricFamily(
+            "rag_cache_evictions", "Entries evicted (LRU or expired)", labels=["cache"]
+        )
+        size = GaugeMetricFamily("rag_cache_entries", "Entries in memory", labels=["cache"])
+        for name, stats in self.source().items():
+            lookups.add_metric([name, "hit"], stats["hits"])
+            lookups.add_metric([name, "miss"], stats["misses"])
+            evictions.add_metric([name], stats["evictions"])
+            size.add_metric([name], stats["size"])
+        yield from (lookups, evictions, size)
@@ -0,0 +1,105 @@
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+from chunking import load_token_counter as _tokenizer_counter
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+SYSTEM_PROMPT = "Você é um assistente médico útil e preciso. Use o contexto abaixo para responder à pergunta."
+
+# Chat-template tokens added around each message (role markers, separators)
+_MESSAGE_OVERHEAD = 4
+
+
+def load_token_counter(path: Optional[str] = None) -> Callable[[str], int]:
+    """Token counter for the LLM's own tokenizer (a local tokenizer.json).
+
+    PROMPT_TOKENIZER points to the file (the image ships Qwen2.5's); without
+    it, or if it cannot be loaded, the chunker's estimate is used.
+    """
+    return _tokenizer_counter(path or os.getenv("PROMPT_TOKENIZER"))
+
+
+class Prompt:
+    def __init__(self, messages: List[Dict], tokens: int, used_docs: int, dropped_docs: int):
+        self.messages = messages
+        self.tokens = tokens
+        self.used_docs = used_docs
+        self.dropped_docs = dropped_docs
+
+    def debug_text(self) -> str:
+        """Plain-text view of the prompt for the education panel."""
+        return "\n".join(f"{m['role'].upper()}: {m['content']}" for m in self.messages)
+
+
+class PromptBuilder:
+    """Assembles the chat prompt under a context token budget.
+
+    Retrieved chunks are taken in rank order. Sentences already present in a
+    higher-ranked chunk (chunker overlap, repeated headings, duplicates) are
+    dropped, then chunks are packed until `context_tokens` is reached; the
+    first chunk that does not fit is cut at a sentence boundary if at least
+    `min_chunk_tokens` of budget are left.
+    """
+
+    def __init__(
+        self,
+        context_tokens: int = 1024,
+        min_chunk_tokens: int = 32,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        self.context_tokens = context_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.count = token_counter or load_token_counter()
+
+    @classmethod
+    def from_env(cls) -> "PromptBuilder":
+        return cls(
+            context_tokens=int(os.getenv("PROMPT_CONTEXT_TOKENS", "1024")),
+            min_chunk_tokens=int(os.getenv("PROMPT_MIN_CHUNK_TOKENS", "32")),
+        )
+
+    def _compress(self, texts: List[str]) -> List[str]:
+        seen = set()
+        kept, used = [], 0
+        for text in texts:
+            sentences = []
+            for sentence in _SENTENCE_RE.split(text):
+                key = " ".join(sentence.casefold().split())
+                if key and key not in seen:
+                    seen.add(key)
+                    sentences.append(sentence.strip())
+            if not sentences:
+                continue
+
+            line = f"- {' '.join(sentences)}"
+            tokens = self.count(line) + 1  # + newline
+            if used + tokens <= self.context_tokens:
+                kept.append(line)
+                used += tokens
+                continue
+
+            # Budget exhausted: keep the leading sentences that still fit
+            left = self.context_tokens - used
+            if left >= self.min_chunk_tokens:
+                partial = "-"
+                for sentence in sentences:
+                    candidate = f"{partial} {sentence}"
+                    if self.count(candidate) + 1 > left:
+                        break
+                    partial = candidate
+                if partial != "-":
+                    kept.append(partial)
+            break
+        return kept
+
+    def build(self, question: str, docs: List[Dict]) -> Prompt:
+        context_lines = self._compress([d["text"] for d in docs])
+        context = "\n".join(context_lines)
+        messages = [
+            {"role": "system", "content": f"{SYSTEM_PROMPT}\n\nContexto:\n{context}"},
+            {"role": "user", "content": question},
+        ]
+        tokens = sum(self.count(m["content"]) + _MESSAGE_OVERHEAD for m in messages)
+        return Prompt(messages, tokens, len(context_lines), len(docs) - len(context_lines))
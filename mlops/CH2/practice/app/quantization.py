@@ -0,0 +1,127 @@
+import os
+from typing import Callable, Dict, Optional
+
+from qdrant_client.http import models as qmodels
+
+
+class CollectionProfile:
+    """How the dense vectors are stored and searched in Qdrant.
+
+    `float32` keeps the original layout. `scalar` (int8, ~4x smaller) and
+    `binary` (1 bit per dimension, ~32x smaller) keep a quantized copy in
+    RAM for the HNSW search; with `on_disk` the float32 originals live on
+    disk and are only read to rescore the `oversampling * limit` best
+    candidates.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        quantization: Optional[str] = None,
+        on_disk: bool = False,
+        oversampling: float = 1.0,
+        rescore: bool = True,
+        hnsw_m: Optional[int] = None,
+        hnsw_ef_construct: Optional[int] = None,
+        hnsw_ef: Optional[int] = None,
+    ):
+        self.name = name
+        self.quantization = quantization
+        self.on_disk = on_disk
+        self.oversampling = oversampling
+        self.rescore = rescore
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.hnsw_ef = hnsw_ef
+
+    def vectors_config(self, size: int) -> qmodels.VectorParams:
+        return qmodels.VectorParams(
+            size=size,
+            distance=qmodels.Distance.COSINE,
+            on_disk=self.on_disk or None,
+        )
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return qmodels.ScalarQuantization(
+                scalar=qmodels.ScalarQuantizationConfig(
+                    type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return qmodels.BinaryQuantization(
+                binary=qmodels.BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
+
+    def hnsw_config(self) -> Optional[qmodels.HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return qmodels.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def search_params(self) -> Optional[qmodels.SearchParams]:
+        quantization = None
+        if self.quantization:
+            quantization = qmodels.QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return qmodels.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def describe(self) -> Dict:
+        return {
+            "profile": self.name,
+            "quantization": self.quantization,
+            "on_disk": self.on_disk,
+            "oversampling": self.oversampling if self.quantization else None,
+            "rescore": self.rescore if self.quantization else None,
+            "hnsw_m": self.hnsw_m,
+            "hnsw_ef_construct": self.hnsw_ef_construct,
+            "hnsw_ef": self.hnsw_ef,
+        }
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _profile(
+    name: str,
+    quantization: Optional[str],
+    oversampling: float,
+    m: int,
+    ef_construct: int,
+    ef: int,
+) -> CollectionProfile:
+    """Profile with its own defaults; HNSW_* / QUANTIZATION_* env vars override them."""
+    return CollectionProfile(
+        name,
+        quantization=quantization,
+        on_disk=os.getenv("VECTORS_ON_DISK", "false").lower() == "true",
+        oversampling=float(os.getenv("QUANTIZATION_OVERSAMPLING", str(oversampling))),
+        rescore=os.getenv("QUANTIZATION_RESCORE", "true").lower() == "true",
+        hnsw_m=_env_int("HNSW_M") or m,
+        hnsw_ef_construct=_env_int("HNSW_EF_CONSTRUCT") or ef_construct,
+        hnsw_ef=_env_int("HNSW_EF") or ef,
+    )
+
+
+# The coarser the codes the graph is searched with, the more candidates it
+# must visit: int8 barely moves the ranking, so scalar only widens the search
+# beam; 1-bit codes of 384-dim vectors do, so binary also builds a denser
+# graph and fetches more candidates to rescore. Check a change with
+# benchmarks/quantization_benchmark.py (recall@k, latency, RAM per profile).
+PROFILES: Dict[str, Callable[[], CollectionProfile]] = {
+    "float32": lambda: _profile("float32", None, 1.0, m=16, ef_construct=100, ef=100),
+    "scalar": lambda: _profile("scalar", "scalar", 1.5, m=16, ef_construct=128, ef=128),
+    "binary": lambda: _profile("binary", "binary", 3.0, m=32, ef_construct=256, ef=256),
+}
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    name = name or os.getenv("COLLECTION_PROFILE", "float32")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile: {name} (options: {', '.join(PROFILES)})")
+    return PROFILES[name]()
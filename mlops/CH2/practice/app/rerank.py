@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List
+
+from chunking import estimate_tokens
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker:
+    """Cross-encoder re-ranking of over-fetched candidates (ONNX, CPU).
+
+    `rerank` scores every candidate against the query in batches and keeps
+    the best `top_k` whose combined size fits `token_budget`. `model` replaces
+    the local cross-encoder (e.g. inference.RemoteCrossEncoder).
+    """
+
+    def __init__(self, model=None, **model_kwargs):
+        self.enabled = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+        self.model_name = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+        self.candidates = int(os.getenv("RERANK_CANDIDATES", "20"))
+        self.batch_size = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+        self.token_budget = int(os.getenv("RERANK_TOKEN_BUDGET", "1024"))
+        self.model = None
+        if self.enabled and model is not None:
+            self.model = model
+        elif self.enabled:
+            logger.info(f"Loading re-ranker: {self.model_name}")
+            self.model = TextCrossEncoder(model_name=self.model_name, **model_kwargs)
+
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._total_ms = 0.0
+        self._last_ms = 0.0
+
+    def rerank(self, query: str, docs: List[Dict], top_k: int) -> List[Dict]:
+        if not docs:
+            return docs
+        start = time.perf_counter()
+        scores = self.model.rerank(
+            query, [d["text"] for d in docs], batch_size=self.batch_size
+        )
+        ranked = sorted(
+            ({**d, "rerank_score": float(s)} for d, s in zip(docs, scores)),
+            key=lambda d: d["rerank_score"],
+            reverse=True,
+        )
+
+        kept, used = [], 0
+        for doc in ranked:
+            tokens = estimate_tokens(doc["text"])
+            # The best candidate is always kept, even if it alone is over budget
+            if kept and used + tokens > self.token_budget:
+                continue
+            kept.append(doc)
+            used += tokens
+            if len(kept) == top_k:
+                break
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._calls += 1
+            self._total_ms += elapsed_ms
+            self._last_ms = elapsed_ms
+        logger.info(
+            f"Rerank: {len(docs)} candidates -> {len(kept)} docs "
+            f"({used} tokens) in {elapsed_ms:.1f}ms"
+        )
+        return kept
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "model": self.model_name if self.enabled else None,
+                "candidates": self.candidates,
+                "calls": self._calls,
+                "avg_ms": round(self._total_ms / self._calls, 1) if self._calls else 0.0,
+                "last_ms": round(self._last_ms, 1),
+            }
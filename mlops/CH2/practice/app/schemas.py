@@ -1,21 +1,46 @@
-from typing import Dict, List
+from typing import Annotated, Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class IngestRequest(BaseModel):
     texts: List[str]
     source: str = "user_upload"
+    specialty: Optional[str] = None
+    document_id: Optional[str] = None  # default: hash of `source`
 
 
 class IngestResponse(BaseModel):
     collection: str
     inserted: int
+    skipped: int = 0  # chunks already stored (same source + text)
+
+
+# "dense": embeddings only; "hybrid": dense + BM25 fused with RRF
+SearchMode = Literal["dense", "hybrid"]
+
+# Results per query; bad values are rejected here (422), before reaching Qdrant
+MAX_TOP_K = 100
+TopK = Annotated[int, Field(ge=1, le=MAX_TOP_K)]
+
+
+class SearchFilters(BaseModel):
+    """Payload filters applied inside the vector search (all must match)."""
+
+    sources: Optional[List[str]] = None
+    specialties: Optional[List[str]] = None
+    document_ids: Optional[List[str]] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+    ingested_after: Optional[int] = None  # epoch seconds, inclusive
+    ingested_before: Optional[int] = None
 
 
 class SearchRequest(BaseModel):
     query: str
-    top_k: int = 3
+    top_k: TopK = 3
+    mode: SearchMode = "dense"
+    filters: Optional[SearchFilters] = None
 
 
 class SearchResponse(BaseModel):
@@ -24,7 +49,11 @@ class SearchResponse(BaseModel):
 
 class AskRequest(BaseModel):
     question: str
-    top_k: int = 3
+    top_k: TopK = 3
+    mode: SearchMode = "dense"
+    rerank: Optional[bool] = None  # None = server default (RERANK_ENABLED)
+    filters: Optional[SearchFilters] = None
+    debug: bool = False  # also return the prompt sent to the LLM
 
 
 class AskResponse(BaseModel):
@@ -32,4 +61,57 @@ class AskResponse(BaseModel):
     context: List[Dict]
     # Educational fields
     retrieved_docs: List[Dict] # Rich list of docs with scores
-    built_prompt: str         # The exact prompt sent to LLM
+    built_prompt: Optional[str] = None  # The exact prompt sent to LLM (debug only)
+    prompt_tokens: int = 0              # 0 when answered from the cache
+
+
+class IngestJob(BaseModel):
+    job_id: str
+    filename: str
+    specialty: Optional[str] = None
+    state: str  # queued | running | succeeded | failed
+    chunks_processed: int
+    chunks_inserted: int
+    chunks_skipped: int = 0
+    chunks_total: Optional[int] = None
+    error: Optional[str] = None
+    queued_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+# --- Batch endpoints ---
+MAX_BATCH_SIZE = 1000
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    top_k: TopK = 3
+    mode: SearchMode = "dense"
+    filters: Optional[SearchFilters] = None  # applied to every query
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[List[Dict]]  # one result list per query, in order
+
+
+class BatchAskRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    top_k: TopK = 3
+    mode: SearchMode = "dense"
+    rerank: Optional[bool] = None
+    filters: Optional[SearchFilters] = None
+    debug: bool = False
+
+
+class BatchAskItem(BaseModel):
+    question: str
+    answer: Optional[str] = None
+    retrieved_docs: List[Dict]
+    built_prompt: Optional[str] = None
+    prompt_tokens: int = 0
+    error: Optional[str] = None
+
+
+class BatchAskResponse(BaseModel):
+    results: List[BatchAskItem]
@@ -1,132 +1,577 @@
-import io
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
 import uuid
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-import docx
-import pypdf
-import pytesseract
+import httpx
 import requests
-from fastembed import TextEmbedding
-from PIL import Image
+from cache import AnswerCache, TTLCache, normalize_text
+from chunking import get_chunker
+from extraction import ExtractionEngine, ExtractionError
+from fastembed import SparseTextEmbedding, TextEmbedding
+from health import CircuitBreaker, CircuitOpenError, HealthMonitor
+from inference import InferenceClient, RemoteCrossEncoder, RemoteTextEmbedding
+from metrics import (
+    DEPENDENCY_ERRORS,
+    INGESTED_CHUNKS,
+    PROMPT_TOKENS,
+    STAGE_SECONDS,
+    TTFT_SECONDS,
+    timed,
+)
+from prompting import PromptBuilder
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from quantization import get_profile
+from rerank import Reranker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DENSE_MODEL = "BAAI/bge-small-en-v1.5"
 
-class DocumentProcessor:
-    @staticmethod
-    def process_pdf(file_content: bytes) -> str:
-        try:
-            pdf_reader = pypdf.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            logger.error(f"Error processing PDF: {e}")
-            return ""
 
-    @staticmethod
-    def process_docx(file_content: bytes) -> str:
-        try:
-            doc = docx.Document(io.BytesIO(file_content))
-            return "\n".join([para.text for para in doc.paragraphs])
-        except Exception as e:
-            logger.error(f"Error processing DOCX: {e}")
-            return ""
+def model_kwargs() -> Dict:
+    """FastEmbed options shared by every model the API loads.
 
-    @staticmethod
-    def process_image(file_content: bytes) -> str:
-        try:
-            image = Image.open(io.BytesIO(file_content))
-            return pytesseract.image_to_string(image)
-        except Exception as e:
-            logger.error(f"Error processing Image: {e}")
-            return ""
+    Models are resolved from FASTEMBED_CACHE_PATH (pre-baked in the image);
+    MODELS_LOCAL_ONLY=true forbids downloads at startup. ONNX sessions are
+    created lazily, on the first call (see OrchestratorService.warm_up).
+    """
+    return {
+        "lazy_load": True,
+        "local_files_only": os.getenv("MODELS_LOCAL_ONLY", "false").lower() == "true",
+    }
 
-    @staticmethod
-    def process_txt(file_content: bytes) -> str:
-        try:
-            return file_content.decode("utf-8")
-        except Exception as e:
-            logger.error(f"Error processing TXT: {e}")
-            return ""
+
+class _SerializedClient:
+    """Runs one call at a time: the local-mode QdrantClient is not thread-safe."""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def qdrant_unavailable(exc: Exception) -> bool:
+    """True if `exc` says Qdrant is down (transport error or 5xx).
+
+    Errors caused by the request itself (4xx, validation in the client or in
+    local mode) say nothing about Qdrant and must not trip its breaker.
+    """
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code is None or exc.status_code >= 500
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is None or exc.response.status_code >= 500
+    return isinstance(
+        exc,
+        (
+            ResponseHandlingException,
+            httpx.TransportError,
+            requests.ConnectionError,
+            requests.Timeout,
+            ConnectionError,
+            TimeoutError,
+        ),
+    )
 
 
 class VectorDbService:
-    def __init__(self):
+    def __init__(self, inference: Optional[InferenceClient] = None):
         self.collection_name = os.getenv("QDRANT_COLLECTION", "workshop_docs")
         qdrant_host = os.getenv("QDRANT_HOST", "qdrant")
         qdrant_port = int(os.getenv("QDRANT_PORT", "6333"))
 
-        logger.info("Loading FastEmbed model...")
-        self.embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+        if inference is not None:
+            # Multi-worker mode: the model lives in the shared inference process
+            logger.info("Using the shared inference server for embeddings")
+            self.embedder = RemoteTextEmbedding(inference)
+        else:
+            logger.info("Loading FastEmbed model...")
+            self.embedder = TextEmbedding(model_name=DENSE_MODEL, **model_kwargs())
+
+        # Hybrid retrieval: BM25 sparse vectors stored next to the dense ones
+        self.hybrid_enabled = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        self.hybrid_ready = False  # set by ensure_collection
+        self.payload_indexed = False  # set by ensure_collection
+        self.hybrid_prefetch = int(os.getenv("HYBRID_PREFETCH", "20"))
+        self.sparse_embedder = None
+        if self.hybrid_enabled:
+            logger.info("Loading BM25 sparse model...")
+            self.sparse_embedder = SparseTextEmbedding(
+                model_name="Qdrant/bm25",
+                language=os.getenv("BM25_LANGUAGE", "portuguese"),
+                **model_kwargs(),
+            )
 
-        logger.info(f"Connecting to Qdrant: {qdrant_host}:{qdrant_port}")
-        self.qdrant = QdrantClient(host=qdrant_host, port=qdrant_port)
+        if qdrant_host == ":memory:":
+            # Local in-process Qdrant (benchmarks / development without Docker)
+            logger.info("Using in-memory Qdrant")
+            self.qdrant = _SerializedClient(QdrantClient(":memory:"))
+        else:
+            logger.info(f"Connecting to Qdrant: {qdrant_host}:{qdrant_port}")
+            self.qdrant = QdrantClient(host=qdrant_host, port=qdrant_port)
         self.vector_size = 384
+        # Storage/search layout of the dense vectors (COLLECTION_PROFILE)
+        self.profile = get_profile()
+        self.breaker = CircuitBreaker.from_env("qdrant")
+
+        # Streaming ingest: chunks are embedded and upserted in batches of this size
+        self.ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+        # Query-vector cache: hot triage questions skip the embedding model
+        self.query_cache = TTLCache(
+            maxsize=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+        )
+
+        # Called after every successful ingest (e.g. to invalidate answer caches)
+        self.ingest_listeners: List[Callable[[], None]] = []
+
+    SPARSE_VECTOR = "bm25"
+
+    # Payload fields that filters can use; indexed so Qdrant filters during
+    # the HNSW traversal instead of scanning
+    PAYLOAD_INDEXES = {
+        "source": qmodels.PayloadSchemaType.KEYWORD,
+        "specialty": qmodels.PayloadSchemaType.KEYWORD,
+        "document_id": qmodels.PayloadSchemaType.KEYWORD,
+        "page": qmodels.PayloadSchemaType.INTEGER,
+        "ingested_at": qmodels.PayloadSchemaType.INTEGER,
+    }
 
     def ensure_collection(self) -> None:
         try:
             if not self.qdrant.collection_exists(self.collection_name):
-                logger.info(f"Creating collection: {self.collection_name}")
+                logger.info(
+                    f"Creating collection: {self.collection_name} "
+                    f"(profile: {self.profile.name})"
+                )
+                # A new (or dropped and recreated) collection has neither
+                self.payload_indexed = False
+                self.hybrid_ready = False
+                sparse_config = None
+                if self.hybrid_enabled:
+                    # IDF is computed by Qdrant from the stored term frequencies
+                    sparse_config = {
+                        self.SPARSE_VECTOR: qmodels.SparseVectorParams(
+                            modifier=qmodels.Modifier.IDF
+                        )
+                    }
                 self.qdrant.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=qmodels.VectorParams(
-                        size=self.vector_size,
-                        distance=qmodels.Distance.COSINE,
-                    ),
+                    vectors_config=self.profile.vectors_config(self.vector_size),
+                    sparse_vectors_config=sparse_config,
+                    quantization_config=self.profile.quantization_config(),
+                    hnsw_config=self.profile.hnsw_config(),
                 )
+            if not self.payload_indexed:
+                # Idempotent; also adds the indexes to collections created before
+                for field, schema in self.PAYLOAD_INDEXES.items():
+                    self.qdrant.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field,
+                        field_schema=schema,
+                    )
+                self.payload_indexed = True
+            if self.hybrid_enabled and not self.hybrid_ready:
+                params = self.qdrant.get_collection(self.collection_name).config.params
+                self.hybrid_ready = self.SPARSE_VECTOR in (params.sparse_vectors or {})
+                if not self.hybrid_ready:
+                    logger.warning(
+                        f"Collection {self.collection_name} has no sparse vectors "
+                        "(created before hybrid search); recreate it to enable hybrid mode"
+                    )
         except Exception as e:
             logger.error(f"Error ensuring collection: {e}")
 
+    def drop_collection(self) -> None:
+        """Deletes the collection; the next ensure_collection recreates it."""
+        self.qdrant.delete_collection(self.collection_name)
+        self.payload_indexed = False
+        self.hybrid_ready = False
+
     def check_health(self) -> bool:
         try:
-            # Lightweight check: get collection info
-            self.qdrant.get_collection(self.collection_name)
+            # Lightweight reachability check; the collection may not exist
+            # yet while seeding, which must not trip the breaker
+            self.qdrant.collection_exists(self.collection_name)
             return True
         except Exception:
             return False
 
-    def ingest(self, texts: List[str], source: str) -> int:
+    @staticmethod
+    def point_id(text: str, source: str) -> str:
+        """Content-addressed point ID: re-ingesting the same chunk skips the embedding.
+
+        Metadata is deliberately not part of the ID, so re-uploading a
+        document with another specialty updates the stored points in place
+        (see `ingest`) instead of adding duplicates under new IDs.
+        """
+        digest = hashlib.sha256(f"{source}\n{' '.join(text.split())}".encode("utf-8"))
+        return str(uuid.UUID(digest.hexdigest()[:32]))
+
+    def ingest(
+        self,
+        texts: List[str],
+        source: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        metadata: Optional[Dict] = None,
+        chunk_metadata: Optional[List[Dict]] = None,
+    ) -> Tuple[int, int]:
+        """Embeds and upserts `texts` in batches; returns (inserted, skipped).
+
+        Every point's payload holds the text, `source`, `document_id` (default:
+        hash of the source), `ingested_at` (epoch seconds) and the document-level
+        `metadata` (e.g. specialty); `chunk_metadata[i]` adds per-chunk fields
+        (e.g. page) to `texts[i]`.
+
+        Each batch is checked against Qdrant first and chunks that are already
+        stored (same source + normalized text) are skipped before embedding.
+        If their metadata changed (e.g. a re-upload with another specialty),
+        the new fields are written onto the stored points (`set_payload`);
+        fields the new upload leaves out are kept, as is `ingested_at`.
+        Only one batch is embedded at a time, so peak memory is bounded by the
+        batch size instead of the document size, and while batch N is being
+        upserted (wait=False) in a background thread, batch N+1 is already
+        being embedded. `on_progress(done, total)` is called after each batch.
+        """
         self.ensure_collection()
         if not texts:
-            return 0
+            return 0, 0
+
+        total = len(texts)
+        batch_size = max(1, self.ingest_batch_size)
+        seen = set()
+        base_payload = {
+            "source": source,
+            "document_id": hashlib.sha256(source.encode("utf-8")).hexdigest()[:16],
+            "ingested_at": int(time.time()),
+            **{k: v for k, v in (metadata or {}).items() if v is not None},
+        }
+
+        def payload(i: int) -> Dict:
+            extra = chunk_metadata[i] if chunk_metadata else {}
+            return {**base_payload, **extra, "text": texts[i]}
 
-        embeddings = list(self.embedder.embed(texts))
+        inserted = skipped = updated = 0
+        pending = None
+        ready: List[qmodels.PointStruct] = []
+        with ThreadPoolExecutor(max_workers=1) as upserter:
+            for start in range(0, total, batch_size):
+                batch = {}
+                for i in range(start, min(start + batch_size, total)):
+                    point_id = self.point_id(texts[i], source)
+                    if point_id not in seen:
+                        seen.add(point_id)
+                        batch[point_id] = i
 
-        points = [
-            qmodels.PointStruct(
-                id=str(uuid.uuid4()),
-                vector=emb.tolist(),
-                payload={"text": text, "source": source},
+                existing = set()
+                changes: Dict[str, Dict] = {}
+                if batch:
+                    found = self.qdrant.retrieve(
+                        collection_name=self.collection_name,
+                        ids=list(batch),
+                        with_payload=qmodels.PayloadSelectorExclude(exclude=["text"]),
+                        with_vectors=False,
+                    )
+                    for point in found:
+                        pid = str(point.id)
+                        existing.add(pid)
+                        stored = point.payload or {}
+                        changed = {
+                            k: v
+                            for k, v in payload(batch[pid]).items()
+                            if k not in ("text", "ingested_at") and stored.get(k) != v
+                        }
+                        if changed:
+                            changes[pid] = changed
+                new = {pid: i for pid, i in batch.items() if pid not in existing}
+
+                for pid, changed in changes.items():
+                    self.qdrant.set_payload(
+                        collection_name=self.collection_name, payload=changed, points=[pid]
+                    )
+                updated += len(changes)
+
+                skipped += min(batch_size, total - start) - len(new)
+                if new:
+                    new_texts = [texts[i] for i in new.values()]
+                    embeddings = self.embedder.embed(new_texts, batch_size=batch_size)
+                    vectors = [emb.tolist() for emb in embeddings]
+                    if self.hybrid_ready:
+                        sparse = self.sparse_embedder.embed(new_texts, batch_size=batch_size)
+                        vectors = [
+                            {
+                                "": dense,
+                                self.SPARSE_VECTOR: qmodels.SparseVector(
+                                    indices=sp.indices.tolist(), values=sp.values.tolist()
+                                ),
+                            }
+                            for dense, sp in zip(vectors, sparse)
+                        ]
+                    points = [
+                        qmodels.PointStruct(id=pid, vector=vector, payload=payload(i))
+                        for (pid, i), vector in zip(new.items(), vectors)
+                    ]
+
+                    # Keep at most one upsert in flight; the newest batch is held
+                    # back so the last one can be sent with wait=True
+                    if ready:
+                        if pending is not None:
+                            pending.result()
+                        pending = upserter.submit(
+                            self.qdrant.upsert,
+                            collection_name=self.collection_name,
+                            points=ready,
+                            wait=False,
+                        )
+                    ready = points
+                    inserted += len(points)
+
+                done = min(start + batch_size, total)
+                logger.info(
+                    f"Ingest progress ({source}): {done}/{total} chunks "
+                    f"({inserted} new, {skipped} already stored, {updated} with new metadata)"
+                )
+                if on_progress:
+                    on_progress(done, total)
+
+            if pending is not None:
+                pending.result()
+
+        # Last batch waits, so the data is searchable when we return
+        if ready:
+            self.qdrant.upsert(
+                collection_name=self.collection_name, points=ready, wait=True
             )
-            for text, emb in zip(texts, embeddings)
+
+        INGESTED_CHUNKS.labels("inserted").inc(inserted)
+        INGESTED_CHUNKS.labels("skipped").inc(skipped)
+        INGESTED_CHUNKS.labels("updated").inc(updated)
+        if inserted or updated:
+            for listener in self.ingest_listeners:
+                listener()
+        return inserted, skipped
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Query vectors from the cache; all misses go to FastEmbed in one batch."""
+        # bge-small-en-v1.5 lowercases its input, so the normalized key is safe
+        keys = [normalize_text(q) for q in queries]
+        vectors = [self.query_cache.get(key) for key in keys]
+        missing = {}
+        for key, query, vector in zip(keys, queries, vectors):
+            if vector is None:
+                missing.setdefault(key, query)
+        if missing:
+            with timed("embed"):
+                try:
+                    embedded = list(
+                        self.embedder.embed(
+                            list(missing.values()), batch_size=self.ingest_batch_size
+                        )
+                    )
+                except Exception:
+                    DEPENDENCY_ERRORS.labels("embedder").inc()
+                    raise
+            for key, emb in zip(list(missing), embedded):
+                missing[key] = emb.tolist()
+                self.query_cache.set(key, missing[key])
+            vectors = [v if v is not None else missing[k] for k, v in zip(keys, vectors)]
+        return vectors
+
+    @staticmethod
+    def build_filter(filters: Optional[Dict]) -> Optional[qmodels.Filter]:
+        """Qdrant filter from request filters (see schemas.SearchFilters).
+
+        Lists match any of their values; `page_*` / `ingested_*` are
+        inclusive ranges. All conditions must hold.
+        """
+        if not filters:
+            return None
+        must = []
+        for field, key in (
+            ("source", "sources"),
+            ("specialty", "specialties"),
+            ("document_id", "document_ids"),
+        ):
+            if filters.get(key):
+                must.append(
+                    qmodels.FieldCondition(key=field, match=qmodels.MatchAny(any=filters[key]))
+                )
+        for field, low, high in (
+            ("page", "page_from", "page_to"),
+            ("ingested_at", "ingested_after", "ingested_before"),
+        ):
+            if filters.get(low) is not None or filters.get(high) is not None:
+                must.append(
+                    qmodels.FieldCondition(
+                        key=field, range=qmodels.Range(gte=filters.get(low), lte=filters.get(high))
+                    )
+                )
+        return qmodels.Filter(must=must) if must else None
+
+    def _query_spec(
+        self, query_vector: List[float], sparse, top_k: int, query_filter=None
+    ) -> Dict:
+        """QueryRequest arguments; hybrid when `sparse` is given.
+
+        `params` carries the profile's HNSW / quantization rescoring settings
+        and `filter` the payload filter (query_points takes them as
+        `search_params` / `query_filter`). In hybrid mode both prefetches are
+        filtered, so RRF only fuses matching points.
+        """
+        params = self.profile.search_params()
+        if sparse is None:
+            return {
+                "query": query_vector,
+                "filter": query_filter,
+                "params": params,
+                "limit": top_k,
+                "with_payload": True,
+            }
+        prefetch_limit = max(self.hybrid_prefetch, top_k)
+        return {
+            "prefetch": [
+                qmodels.Prefetch(
+                    query=query_vector, filter=query_filter, params=params, limit=prefetch_limit
+                ),
+                qmodels.Prefetch(
+                    query=qmodels.SparseVector(
+                        indices=sparse.indices.tolist(),
+                        values=sparse.values.tolist(),
+                    ),
+                    using=self.SPARSE_VECTOR,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                ),
+            ],
+            "query": qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+            "filter": query_filter,
+            "limit": top_k,
+            "with_payload": True,
+        }
+
+    @staticmethod
+    def _to_docs(hits) -> List[Dict]:
+        return [
+            {
+                "text": hit.payload.get("text", ""),
+                "source": hit.payload.get("source", "unknown"),
+                "specialty": hit.payload.get("specialty"),
+                "document_id": hit.payload.get("document_id"),
+                "page": hit.payload.get("page"),
+                "score": float(hit.score),
+            }
+            for hit in hits
         ]
 
-        self.qdrant.upsert(collection_name=self.collection_name, points=points)
-        return len(points)
+    def _release_trial(self) -> None:
+        """Called when a search fails before reaching Qdrant (e.g. the embedder).
 
-    def search(self, query: str, top_k: int) -> List[Dict]:
-        query_vector = list(self.embedder.embed([query]))[0].tolist()
+        That says nothing about Qdrant, so it is not recorded as a failure,
+        but a half-open trial taken by `allow()` is given back: otherwise the
+        breaker would stay half-open and reject every later call.
+        """
+        self.breaker.release()
 
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int,
+        mode: str = "dense",
+        filters: Optional[Dict] = None,
+    ) -> List[List[Dict]]:
+        """Many searches with one embedding batch and one Qdrant batch query."""
+        if not queries:
+            return []
+        if not self.breaker.allow():
+            raise CircuitOpenError("Qdrant unavailable (circuit open)")
+        try:
+            vectors = self.embed_queries(queries)
+            query_filter = self.build_filter(filters)
+            sparse = [None] * len(queries)
+            if mode == "hybrid" and self.hybrid_ready:
+                with timed("embed"):
+                    sparse = list(self.sparse_embedder.query_embed(queries))
+        except Exception:
+            self._release_trial()
+            raise
+        try:
+            with timed("search"):
+                responses = self.qdrant.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=[
+                        qmodels.QueryRequest(
+                            **self._query_spec(vector, sp, top_k, query_filter)
+                        )
+                        for vector, sp in zip(vectors, sparse)
+                    ],
+                )
+        except Exception as e:
+            self._record_error(e)
+            raise
+        self.breaker.record_success()
+        return [self._to_docs(response.points) for response in responses]
+
+    def search(
+        self, query: str, top_k: int, mode: str = "dense", filters: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Semantic search. mode="hybrid" fuses dense + BM25 results with RRF.
+
+        `filters` (see build_filter) are applied inside Qdrant's search.
+        """
+        if not self.breaker.allow():
+            logger.warning("Search skipped: Qdrant circuit is open")
+            return []
+        try:
+            query_vector = self.embed_query(query)
+            query_filter = self.build_filter(filters)
+            sparse = None
+            if mode == "hybrid" and self.hybrid_ready:
+                with timed("embed"):
+                    sparse = next(iter(self.sparse_embedder.query_embed(query)))
+        except Exception:
+            self._release_trial()
+            raise
+
+        search_started = time.perf_counter()
         try:
             if hasattr(self.qdrant, "query_points"):
+                spec = self._query_spec(query_vector, sparse, top_k, query_filter)
                 hits = self.qdrant.query_points(
                     collection_name=self.collection_name,
-                    query=query_vector,
-                    limit=top_k,
-                    with_payload=True,
+                    search_params=spec.pop("params", None),
+                    query_filter=spec.pop("filter", None),
+                    **spec,
                 ).points
             elif hasattr(self.qdrant, "search"):
                 hits = self.qdrant.search(
                     collection_name=self.collection_name,
                     query_vector=query_vector,
+                    query_filter=query_filter,
+                    search_params=self.profile.search_params(),
                     limit=top_k,
                     with_payload=True,
                 )
@@ -140,110 +585,507 @@ class VectorDbService:
                 resp.raise_for_status()
                 hits = []
 
-            return [
-                {
-                    "text": hit.payload.get("text", ""),
-                    "source": hit.payload.get("source", "unknown"),
-                    "score": float(hit.score),
-                }
-                for hit in hits
-            ]
+            STAGE_SECONDS.labels("search").observe(time.perf_counter() - search_started)
+            self.breaker.record_success()
+            return self._to_docs(hits)
         except Exception as e:
             logger.error(f"Search failed: {e}")
+            self._record_error(e)
             return []
 
+    def _record_error(self, exc: Exception) -> None:
+        """Feeds a failed Qdrant call to the breaker if Qdrant was at fault."""
+        if qdrant_unavailable(exc):
+            DEPENDENCY_ERRORS.labels("qdrant").inc()
+            self.breaker.record_failure()
+        else:
+            self._release_trial()
+
 
 class LLMService:
     def __init__(self):
         # External LLM Service URL
         self.api_url = os.getenv("LLM_API_URL", "http://llm_service:8000/v1")
         logger.info(f"LLM Service URL: {self.api_url}")
+        self.model_params = {"max_tokens": 512, "temperature": 0.3}
 
-    def generate_response(self, context: str, question: str) -> Tuple[str, str]:
-        """Returns (answer, full_prompt)"""
+        # Concurrency: shared keep-alive pool + cap on in-flight generations
+        self.max_in_flight = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "120"))
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker.from_env("llm")
 
-        system_prompt = "Você é um assistente médico útil e preciso. Use o contexto abaixo para responder à pergunta."
+    async def start(self) -> None:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.api_url,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_in_flight,
+                    max_keepalive_connections=self.max_in_flight,
+                ),
+            )
 
-        # OpenaAI-compatible Prompt Construction
-        messages = [
-            {"role": "system", "content": f"{system_prompt}\n\nContexto:\n{context}"},
-            {"role": "user", "content": question},
-        ]
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
 
-        # Visualize prompt for education
-        full_prompt_debug = (
-            f"SYSTEM: {system_prompt}\nCONTEXT: {context}\nUSER: {question}"
-        )
+    async def generate_response(
+        self, messages: List[Dict], timeout: Optional[float] = None
+    ) -> Tuple[str, bool]:
+        """Returns (answer, ok) for OpenAI-style `messages` (see PromptBuilder).
 
+        On failure `answer` holds the error. `timeout` is the deadline for the
+        whole call, including the time spent waiting for a free slot; defaults
+        to LLM_TIMEOUT.
+        """
+        if not self.breaker.allow():
+            return "Erro ao contatar LLM: serviço indisponível", False
         try:
-            resp = requests.post(
-                f"{self.api_url}/chat/completions",
-                json={"messages": messages, "max_tokens": 512, "temperature": 0.3},
-                timeout=120,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            answer = data["choices"][0]["message"]["content"]
-            return answer, full_prompt_debug
+            with timed("llm"):
+                answer = await asyncio.wait_for(
+                    self._chat_completion(messages), timeout or self.timeout
+                )
+            self.breaker.record_success()
+            return answer, True
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            logger.error("LLM call failed: deadline exceeded")
+            DEPENDENCY_ERRORS.labels("llm").inc()
+            self.breaker.record_failure()
+            return "Erro ao contatar LLM: tempo limite excedido", False
         except Exception as e:
             logger.error(f"LLM call failed: {e}")
-            return f"Erro ao contatar LLM: {str(e)}", full_prompt_debug
+            DEPENDENCY_ERRORS.labels("llm").inc()
+            self.breaker.record_failure()
+            return f"Erro ao contatar LLM: {str(e)}", False
 
-    def check_health(self) -> bool:
+    async def stream_tokens(self, messages: List[Dict]) -> AsyncIterator[str]:
+        """Yields content deltas from an OpenAI-compatible `stream=true` call."""
+        if not self.breaker.allow():
+            raise CircuitOpenError("serviço indisponível")
+        await self.start()
         try:
+            async with self._semaphore:
+                async with self.client.stream(
+                    "POST",
+                    "/chat/completions",
+                    json={"messages": messages, "stream": True, **self.model_params},
+                ) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        choices = json.loads(data).get("choices") or [{}]
+                        token = choices[0].get("delta", {}).get("content")
+                        if token:
+                            yield token
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away: the call proved nothing either way
+            self.breaker.release()
+            raise
+        except Exception:
+            DEPENDENCY_ERRORS.labels("llm").inc()
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    async def _chat_completion(self, messages: List[Dict]) -> str:
+        await self.start()
+        async with self._semaphore:
+            resp = await self.client.post(
+                "/chat/completions",
+                json={"messages": messages, **self.model_params},
+            )
+        resp.raise_for_status()
+        data = resp.json()
+        return data["choices"][0]["message"]["content"]
+
+    async def check_health(self) -> bool:
+        try:
+            await self.start()
             # Lightweight check to LLM models endpoint
-            resp = requests.get(f"{self.api_url}/models", timeout=2.0)
+            resp = await self.client.get("/models", timeout=2.0)
             return resp.status_code == 200
         except Exception:
             return False
 
 class OrchestratorService:
     def __init__(self):
-        self.vector_db = VectorDbService()
+        # Shared embedding / re-ranking process (API_WORKERS > 1); None = local models
+        self.inference = InferenceClient.from_env()
+        self.vector_db = VectorDbService(self.inference)
         self.llm_service = LLMService()
-        self.document_processor = DocumentProcessor()
+        self.extractor = ExtractionEngine()
+        self.chunker = get_chunker()
+        self.reranker = Reranker(
+            model=RemoteCrossEncoder(self.inference) if self.inference else None,
+            **model_kwargs(),
+        )
+        self.prompts = PromptBuilder.from_env()
+        self.batch_llm_concurrency = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+        # Full answer cache: same question + same retrieved chunks = same answer
+        self.answer_cache = AnswerCache(
+            maxsize=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+            path=os.getenv("ANSWER_CACHE_PATH") or None,
+        )
+        self.vector_db.ingest_listeners.append(self.answer_cache.clear)
+
+        # Background dependency probes; /health serves the cached result
+        self.health = HealthMonitor()
+        self.health.register(
+            "vector_db",
+            lambda: asyncio.to_thread(self.vector_db.check_health),
+            self.vector_db.breaker,
+        )
+        self.health.register("llm", self.llm_service.check_health, self.llm_service.breaker)
+        if self.inference is not None:
+            self.health.register(
+                "inference",
+                lambda: asyncio.to_thread(self.inference.check_health),
+                self.inference.breaker,
+            )
+
+        # Filled in by warm_up(), reported on /health
+        self.startup = {"models": "starting", "seed": "pending"}
+
+    @property
+    def ready(self) -> bool:
+        return self.startup["models"] == "ready"
+
+    def warm_up(self) -> None:
+        """Loads every model with a dummy batch, then seeds the collection.
+
+        Meant to run in the background right after startup: the API answers
+        /health immediately and reports `ready` once the models are loaded.
+        """
+        start = time.perf_counter()
+        try:
+            dummy = ["warm-up"] * 4
+            list(self.vector_db.embedder.embed(dummy))
+            if self.vector_db.sparse_embedder is not None:
+                list(self.vector_db.sparse_embedder.embed(dummy))
+            if self.reranker.model is not None:
+                list(self.reranker.model.rerank("warm-up", dummy))
+        except Exception as e:
+            logger.error(f"Model warm-up failed: {e}")
+            self.startup["models"] = "failed"
+            return
+        self.startup["models"] = "ready"
+        logger.info(f"Models ready in {time.perf_counter() - start:.1f}s")
+
+        self.startup["seed"] = "running"
+        ok = seed_database(self.vector_db)
+        self.startup["seed"] = "done" if ok else "failed"
+
+    def retrieve(
+        self,
+        question: str,
+        top_k: int = 3,
+        mode: str = "dense",
+        rerank: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """Search, optionally over-fetching and re-ranking with the cross-encoder.
+
+        `rerank=None` follows RERANK_ENABLED; it can only be turned on per
+        request when the re-ranker model is loaded.
+        """
+        use_rerank = self.reranker.enabled if rerank is None else rerank
+        if not use_rerank or self.reranker.model is None:
+            return self.vector_db.search(question, top_k, mode, filters)
+
+        candidates = self.vector_db.search(
+            question, max(top_k, self.reranker.candidates), mode, filters
+        )
+        with timed("rerank"):
+            return self.reranker.rerank(question, candidates, top_k)
+
+    def retrieve_batch(
+        self,
+        questions: List[str],
+        top_k: int = 3,
+        mode: str = "dense",
+        rerank: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+    ) -> List[List[Dict]]:
+        """`retrieve` for many questions: one embed batch + one Qdrant batch query."""
+        use_rerank = self.reranker.enabled if rerank is None else rerank
+        if not use_rerank or self.reranker.model is None:
+            return self.vector_db.search_batch(questions, top_k, mode, filters)
+
+        candidates = self.vector_db.search_batch(
+            questions, max(top_k, self.reranker.candidates), mode, filters
+        )
+        with timed("rerank"):
+            return [
+                self.reranker.rerank(question, docs, top_k)
+                for question, docs in zip(questions, candidates)
+            ]
+
+    def _cache_key(self, question: str, docs: List[Dict]) -> str:
+        # The context budget changes the prompt, so it is part of the key
+        params = {**self.llm_service.model_params, "context_tokens": self.prompts.context_tokens}
+        return AnswerCache.make_key(question, docs, params)
+
+    def _build_prompt(self, question: str, docs: List[Dict]):
+        with timed("prompt_build"):
+            prompt = self.prompts.build(question, docs)
+        PROMPT_TOKENS.observe(prompt.tokens)
+        return prompt
+
+    async def _answer(
+        self, question: str, docs: List[Dict], debug: bool = False
+    ) -> Tuple[str, bool, Optional[str], int]:
+        """Cached LLM answer for `question` over `docs`.
+
+        Returns (answer, ok, debug_prompt, prompt_tokens); the debug prompt is
+        only rendered when `debug` is set, and prompt_tokens is 0 when the
+        answer came from the cache (nothing was sent to the LLM).
+        """
+        cache_key = self._cache_key(question, docs)
+        cached = await self.answer_cache.aget(cache_key)
+        if cached is not None:
+            debug_prompt = self.prompts.build(question, docs).debug_text() if debug else None
+            return cached[0], True, debug_prompt, 0
+
+        prompt = self._build_prompt(question, docs)
+        debug_prompt = prompt.debug_text() if debug else None
+        answer, ok = await self.llm_service.generate_response(prompt.messages)
+        if ok:
+            # Errors are returned to the user but never cached
+            await self.answer_cache.aset(cache_key, (answer, debug_prompt or ""))
+        return answer, ok, debug_prompt, prompt.tokens
+
+    async def ask(
+        self,
+        question: str,
+        top_k: int = 3,
+        mode: str = "dense",
+        rerank: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+        debug: bool = False,
+    ) -> Tuple[str, List[Dict], Optional[str], int]:
+        """Returns (answer, docs, debug_prompt, prompt_tokens)."""
+        with timed("total"):
+            # 1. Retrieve (embedding + Qdrant are blocking: keep them off the event loop)
+            docs = await asyncio.to_thread(
+                self.retrieve, question, top_k, mode, rerank, filters
+            )
+
+            # 2. Generate (or reuse a cached answer for the same context)
+            answer, _, debug_prompt, prompt_tokens = await self._answer(
+                question, docs, debug
+            )
+
+        return answer, docs, debug_prompt, prompt_tokens
+
+    async def ask_batch(
+        self,
+        questions: List[str],
+        top_k: int = 3,
+        mode: str = "dense",
+        rerank: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+        debug: bool = False,
+    ) -> List[Dict]:
+        """Answers many questions; results keep the input order.
+
+        Retrieval is batched; generations run concurrently, at most
+        BATCH_LLM_CONCURRENCY at a time. A failing item carries `error`
+        instead of failing the whole batch.
+        """
+        # 1. Retrieve everything at once
+        try:
+            all_docs = await asyncio.to_thread(
+                self.retrieve_batch, questions, top_k, mode, rerank, filters
+            )
+        except Exception as e:
+            logger.error(f"Batch retrieval failed: {e}")
+            return [
+                {
+                    "question": q,
+                    "answer": None,
+                    "retrieved_docs": [],
+                    "built_prompt": None,
+                    "prompt_tokens": 0,
+                    "error": str(e),
+                }
+                for q in questions
+            ]
+
+        # 2. Generate concurrently under a limit
+        limit = asyncio.Semaphore(self.batch_llm_concurrency)
+
+        async def answer_one(question: str, docs: List[Dict]) -> Dict:
+            try:
+                async with limit:
+                    answer, ok, debug_prompt, prompt_tokens = await self._answer(
+                        question, docs, debug
+                    )
+            except Exception as e:
+                # Prompt building, cache I/O...: only this item fails
+                logger.error(f"Batch item failed ({question[:50]!r}): {e}")
+                answer, ok, debug_prompt, prompt_tokens = str(e), False, None, 0
+            return {
+                "question": question,
+                "answer": answer if ok else None,
+                "retrieved_docs": docs,
+                "built_prompt": debug_prompt,
+                "prompt_tokens": prompt_tokens,
+                "error": None if ok else answer,
+            }
+
+        return await asyncio.gather(
+            *(answer_one(q, docs) for q, docs in zip(questions, all_docs))
+        )
+
+    async def ask_stream(
+        self,
+        question: str,
+        top_k: int = 3,
+        mode: str = "dense",
+        rerank: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+        debug: bool = False,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Same pipeline as `ask`, as (event, data) pairs for Server-Sent Events.
+
+        Emits `docs` (retrieved chunks, plus the prompt when `debug` is set)
+        first, then one `token` per LLM delta, then `done` with
+        time-to-first-token, total latency and prompt tokens.
+        """
+        started = time.perf_counter()
 
-    def ask(self, question: str) -> Tuple[str, List[Dict], List[str], str]:
         # 1. Retrieve
-        docs = self.vector_db.search(question, top_k=3)
-        retrieved_texts = [d["text"] for d in docs]
-        context_str = "\n".join([f"- {t}" for t in retrieved_texts])
+        docs = await asyncio.to_thread(
+            self.retrieve, question, top_k, mode, rerank, filters
+        )
+        cache_key = self._cache_key(question, docs)
+        cached = await self.answer_cache.aget(cache_key)
+        prompt = None
+        if cached is None:
+            prompt = self._build_prompt(question, docs)
+        elif debug:
+            prompt = self.prompts.build(question, docs)
+        debug_prompt = prompt.debug_text() if debug else None
+        yield "docs", {"retrieved_docs": docs, "built_prompt": debug_prompt}
 
-        # 2. Generate
-        answer, debug_prompt = self.llm_service.generate_response(context_str, question)
+        # 2. Generate (or replay the cached answer)
+        tokens: List[str] = []
+        ttft = None
+        try:
+            if cached is not None:
+                tokens.append(cached[0])
+                ttft = time.perf_counter() - started
+                TTFT_SECONDS.labels("cache").observe(ttft)
+                yield "token", {"text": cached[0]}
+            else:
+                llm_started = time.perf_counter()
+                async for token in self.llm_service.stream_tokens(prompt.messages):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                        TTFT_SECONDS.labels("llm").observe(ttft)
+                    tokens.append(token)
+                    yield "token", {"text": token}
+                STAGE_SECONDS.labels("llm").observe(time.perf_counter() - llm_started)
+                await self.answer_cache.aset(cache_key, ("".join(tokens), debug_prompt or ""))
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            yield "error", {"detail": f"Erro ao contatar LLM: {str(e)}"}
+            return
+
+        total = time.perf_counter() - started
+        STAGE_SECONDS.labels("total").observe(total)
+        ttft_ms = round(ttft * 1000, 1) if ttft is not None else None
+        logger.info(f"ask_stream: ttft={ttft_ms}ms total={total * 1000:.1f}ms")
+        yield "done", {
+            "ttft_ms": ttft_ms,
+            "total_ms": round(total * 1000, 1),
+            "cached": cached is not None,
+            "prompt_tokens": 0 if cached is not None else prompt.tokens,
+        }
 
-        return answer, docs, retrieved_texts, debug_prompt
-    
     def get_health(self) -> Dict[str, str]:
+        """Last probe result per dependency (see HealthMonitor)."""
+        return {name: probe["status"] for name, probe in self.health.status.items()}
+
+    def get_breaker_stats(self) -> Dict[str, Dict]:
+        stats = {
+            "vector_db": self.vector_db.breaker.stats(),
+            "llm": self.llm_service.breaker.stats(),
+        }
+        if self.inference is not None:
+            stats["inference"] = self.inference.breaker.stats()
+        return stats
+
+    def get_inference_stats(self) -> Optional[Dict]:
+        """Batching stats of the shared inference server (last health probe)."""
+        if self.inference is None:
+            return None
+        return {"socket": self.inference.address, **self.inference.last_stats}
+
+    def get_cache_stats(self) -> Dict[str, Dict]:
         return {
-            "vector_db": "online" if self.vector_db.check_health() else "offline",
-            "llm": "online" if self.llm_service.check_health() else "offline"
+            "query_embedding": self.vector_db.query_cache.stats(),
+            "answer": self.answer_cache.stats(),
         }
     
-    def process_and_ingest_file(self, content: bytes, filename: str) -> int:
+    def process_and_ingest_file(
+        self,
+        content: bytes,
+        filename: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        metadata: Optional[Dict] = None,
+    ) -> Tuple[int, int]:
+        """Extracts, chunks and ingests a file; returns (inserted, skipped).
+
+        PDFs are chunked page by page so every chunk records its `page`;
+        `document_id` defaults to a hash of the file content.
+        """
         ext = filename.split(".")[-1].lower()
-        text = ""
-
-        if ext == "pdf":
-            text = self.document_processor.process_pdf(content)
-        elif ext in ["docx", "doc"]:
-            text = self.document_processor.process_docx(content)
-        elif ext in ["png", "jpg", "jpeg", "tiff"]:
-            text = self.document_processor.process_image(content)
-        elif ext == "txt":
-            text = self.document_processor.process_txt(content)
-        else:
-            raise ValueError(f"Unsupported file type: {ext}")
 
-        if not text.strip():
-            logger.warning(f"No text extracted from {filename}")
-            return 0
+        try:
+            pages = self.extractor.extract_pages(content, ext)
+        except (ValueError, TimeoutError, ExtractionError):
+            raise
+        except Exception as e:
+            logger.error(f"Error processing {ext.upper()}: {e}")
+            pages = []
+
+        chunks: List[str] = []
+        chunk_metadata: List[Dict] = []
+        for number, text in enumerate(pages, start=1):
+            if not text.strip():
+                continue
+            page_chunks = self.chunker.split(text) or [text]  # Fallback
+            chunks.extend(page_chunks)
+            page = {"page": number} if ext == "pdf" else {}
+            chunk_metadata.extend([page] * len(page_chunks))
 
-        chunks = [c.strip() for c in text.split("\n\n") if c.strip()]
         if not chunks:
-            chunks = [text]  # Fallback
+            logger.warning(f"No text extracted from {filename}")
+            return 0, 0
 
-        return self.vector_db.ingest(chunks, source=filename)
+        metadata = {
+            "document_id": hashlib.sha256(content).hexdigest()[:16],
+            **{k: v for k, v in (metadata or {}).items() if v is not None},
+        }
+        return self.vector_db.ingest(
+            chunks,
+            source=filename,
+            on_progress=on_progress,
+            metadata=metadata,
+            chunk_metadata=chunk_metadata,
+        )
 
 
 # --- Seeder Logic ---
@@ -448,14 +1290,20 @@ MEDICAL_DATA = [
 ]
 
 
-def seed_database(service: VectorDbService):
-    try:
-        service.ensure_collection()
-        count = service.qdrant.count(collection_name=service.collection_name).count
-        if count == 0:
-            logger.info("Database empty. Seeding medical data...")
+def seed_database(service: VectorDbService, retries: int = 5) -> bool:
+    """Idempotent: point IDs are content hashes, so only missing chunks are added."""
+    for attempt in range(1, retries + 1):
+        try:
+            service.ensure_collection()
             texts = [item[0] for item in MEDICAL_DATA]
-            service.ingest(texts, source="System Init")
-            logger.info("Seeding complete!")
-    except Exception as e:
-        logger.warning(f"Seeding failed: {e}")
+            specialties = [{"specialty": item[1]} for item in MEDICAL_DATA]
+            inserted, _ = service.ingest(
+                texts, source="System Init", chunk_metadata=specialties
+            )
+            logger.info(f"Seeding complete! ({inserted} new chunks)")
+            return True
+        except Exception as e:
+            logger.warning(f"Seeding failed (attempt {attempt}/{retries}): {e}")
+            if attempt < retries:
+                time.sleep(min(2**attempt, 30))
+    return False
@@ -0,0 +1,121 @@
+"""
+Benchmark: ingest "legacy" (tudo em memória + um único upsert) vs ingest em lotes.
+
+Uso (a partir de mlops/CH2/practice):
+
+    python benchmarks/ingest_benchmark.py --chunks 5000 --batch-size 256
+    python benchmarks/ingest_benchmark.py --qdrant-host localhost   # Qdrant real
+
+Por padrão usa um Qdrant em memória (`QdrantClient(":memory:")`), então mede
+principalmente embedding + montagem dos pontos. Com um Qdrant real o efeito do
+pipelining (upsert com wait=False enquanto o próximo lote é embedado) aparece.
+
+A busca híbrida fica desligada (HYBRID_SEARCH=false): a ingestão legacy não
+gera vetores BM25, então os dois modos só são comparáveis sem eles. O valor
+usado sai no resultado (`hybrid_search`).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from qdrant_client.http import models as qmodels  # noqa: E402
+from services import MEDICAL_DATA, VectorDbService  # noqa: E402
+
+
+def legacy_ingest(service: VectorDbService, texts, source):
+    """Implementação original: materializa todos os embeddings e faz 1 upsert."""
+    service.ensure_collection()
+    embeddings = list(service.embedder.embed(texts))
+    points = [
+        qmodels.PointStruct(
+            id=str(uuid.uuid4()),
+            vector=emb.tolist(),
+            payload={"text": text, "source": source},
+        )
+        for text, emb in zip(texts, embeddings)
+    ]
+    service.qdrant.upsert(collection_name=service.collection_name, points=points)
+    return len(points)
+
+
+def streaming_ingest(service: VectorDbService, texts, source):
+    inserted, skipped = service.ingest(texts, source)
+    return inserted + skipped
+
+
+def synthetic_chunks(n: int):
+    base = [text for text, _ in MEDICAL_DATA]
+    return [f"{base[i % len(base)]} (trecho {i})" for i in range(n)]
+
+
+def run(name, fn, service, texts):
+    service.drop_collection()
+    tracemalloc.start()
+    start = time.perf_counter()
+    inserted = fn(service, texts, "benchmark")
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mode": name,
+        "chunks": inserted,
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(inserted / elapsed, 1),
+        "peak_python_mb": round(peak / 1024 / 1024, 1),
+        "hybrid_search": service.hybrid_enabled,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--qdrant-host", default=None, help="Padrão: Qdrant em memória")
+    parser.add_argument("--qdrant-port", type=int, default=6333)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    os.environ["QDRANT_COLLECTION"] = "benchmark_ingest"
+    os.environ["INGEST_BATCH_SIZE"] = str(args.batch_size)
+    # Legacy não gera vetores BM25; com eles só o modo streaming pagaria o custo
+    os.environ["HYBRID_SEARCH"] = "false"
+
+    # Set before building the service: with ":memory:" it wraps the local
+    # client in _SerializedClient (streaming ingest upserts from a thread)
+    os.environ["QDRANT_HOST"] = args.qdrant_host or ":memory:"
+    os.environ["QDRANT_PORT"] = str(args.qdrant_port)
+    service = VectorDbService()
+
+    texts = synthetic_chunks(args.chunks)
+    # Warm-up: carrega a sessão ONNX antes de medir
+    list(service.embedder.embed(texts[:8]))
+
+    results = [
+        run("legacy", legacy_ingest, service, texts),
+        run("streaming", streaming_ingest, service, texts),
+    ]
+    service.drop_collection()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"hybrid_search={results[0]['hybrid_search']}")
+    print(f"{'mode':<10} {'chunks':>7} {'seconds':>8} {'chunks/s':>9} {'peak MB':>8}")
+    for r in results:
+        print(
+            f"{r['mode']:<10} {r['chunks']:>7} {r['seconds']:>8} "
+            f"{r['chunks_per_sec']:>9} {r['peak_python_mb']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
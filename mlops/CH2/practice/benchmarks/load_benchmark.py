@@ -0,0 +1,345 @@
+"""
+Benchmark de carga: latência e throughput de /search, /ask e /ingest-file.
+
+Uso (a partir de mlops/CH2/practice):
+
+    python benchmarks/load_benchmark.py --concurrency 1,8,32 --requests 200 --out load.json
+    python benchmarks/load_benchmark.py --llm-ttft-ms 500 --env LLM_MAX_IN_FLIGHT=16
+    python benchmarks/load_benchmark.py --api-url http://localhost:8001 --scenarios search
+
+Por padrão sobe tudo localmente, sem Docker:
+
+* um LLM falso compatível com a OpenAI (`stub_llm.py`) com latência configurável;
+* a API (`python main.py`) em um subprocesso, com `QDRANT_HOST=:memory:` e
+  `LLM_API_URL` apontando para o stub. Os modelos do FastEmbed são os reais.
+
+Para o modo com vários workers é preciso um Qdrant real (o `:memory:` seria
+um banco separado por worker):
+`--env API_WORKERS=4 --env QDRANT_HOST=localhost` (Qdrant do `docker compose`).
+
+Para cada cenário e nível de concorrência mede p50/p95/p99, throughput, erros
+e a memória (RSS atual e pico, somada sobre a API e seus subprocessos:
+workers, servidor de inferência, extração). O resultado é salvo em JSON
+(`--out`) para comparar versões com um simples diff.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stub_llm import create_app  # noqa: E402
+
+PRACTICE_DIR = Path(__file__).resolve().parent.parent
+
+# Request ids are unique across scenarios and runs (RUN_ID), so repeated runs
+# against the same API do not turn into answer-cache hits or skipped ingests
+RUN_ID = uuid.uuid4().hex[:8]
+_request_ids = itertools.count()
+
+QUESTIONS = [
+    "Quais são os sintomas da dengue?",
+    "Como funciona o protocolo de Manchester?",
+    "O que é hipertensão arterial?",
+    "Qual a diferença entre AVC isquêmico e hemorrágico?",
+    "Quais doenças são transmitidas pelo Aedes aegypti?",
+    "O que causa a insuficiência renal crônica?",
+    "Sintomas de infarto agudo do miocárdio",
+    "Tratamento de asma e DPOC",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_llm(ttft_ms: float, tokens: int, token_ms: float) -> str:
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(ttft_ms, tokens, token_ms),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        )
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def start_api(llm_url: str, overrides: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "QDRANT_HOST": ":memory:",
+        "QDRANT_COLLECTION": "benchmark_load",
+        "LLM_API_URL": llm_url,
+        "API_PORT": str(port),
+        **overrides,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=PRACTICE_DIR / "app",
+        env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_ready(api_url: str, timeout: float, process: Optional[subprocess.Popen] = None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{api_url}/ready", timeout=2).status_code == 200:
+                # Seeding runs after the models are ready; wait for it too
+                health = httpx.get(f"{api_url}/health", timeout=5).json()
+                if health.get("startup", {}).get("seed") in ("done", "failed"):
+                    return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"API not ready after {timeout:.0f}s")
+
+
+def process_tree(pid: int) -> List[int]:
+    """`pid` and all its descendants (Linux /proc)."""
+    pids, index = [pid], 0
+    while index < len(pids):
+        for task in Path(f"/proc/{pids[index]}/task").glob("*/children"):
+            try:
+                pids.extend(int(child) for child in task.read_text().split())
+            except OSError:
+                pass
+        index += 1
+    return pids
+
+
+def memory_mb(pid: Optional[int]) -> Dict[str, Optional[float]]:
+    """Current and peak RSS of `pid` + descendants (Linux /proc; None elsewhere).
+
+    Shared pages are counted once per process, so with several workers the
+    sum overstates the real footprint a little.
+    """
+    values = {"rss_mb": None, "peak_rss_mb": None, "processes": None}
+    if pid is None:
+        return values
+    totals = {"VmRSS": 0, "VmHWM": 0}
+    pids = process_tree(pid)
+    for child in pids:
+        try:
+            for line in Path(f"/proc/{child}/status").read_text().splitlines():
+                key, _, value = line.partition(":")
+                if key in totals:
+                    totals[key] += int(value.split()[0])
+        except OSError:
+            pass
+    if not totals["VmRSS"]:
+        return values
+    values["rss_mb"] = round(totals["VmRSS"] / 1024, 1)
+    values["peak_rss_mb"] = round(totals["VmHWM"] / 1024, 1)
+    values["processes"] = len(pids)
+    return values
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return round(sorted_values[index], 1)
+
+
+# --- Scenarios: each sends request `i` and returns the HTTP status ---
+
+
+async def search_request(client: httpx.AsyncClient, i: int, args) -> int:
+    resp = await client.post(
+        "/search", json={"query": QUESTIONS[i % len(QUESTIONS)], "top_k": args.top_k}
+    )
+    return resp.status_code
+
+
+async def ask_request(client: httpx.AsyncClient, i: int, args) -> int:
+    question = QUESTIONS[i % len(QUESTIONS)]
+    if not args.repeat_questions:
+        # A unique suffix keeps every request a cache miss
+        question = f"{question} (#{RUN_ID}-{i})"
+    resp = await client.post("/ask", json={"question": question, "top_k": args.top_k})
+    return resp.status_code
+
+
+async def ingest_request(client: httpx.AsyncClient, i: int, args) -> int:
+    """Upload + poll the job: the latency is the end-to-end ingestion time."""
+    paragraphs = [
+        f"Documento {i}, parágrafo {p}: {QUESTIONS[(i + p) % len(QUESTIONS)]} "
+        f"Conteúdo sintético para o benchmark de ingestão {RUN_ID}-{i}-{p}."
+        for p in range(args.ingest_paragraphs)
+    ]
+    resp = await client.post(
+        "/ingest-file",
+        files={"file": (f"bench_{RUN_ID}_{i}.txt", "\n\n".join(paragraphs).encode("utf-8"))},
+    )
+    if resp.status_code != 202:
+        return resp.status_code
+    job_id = resp.json()["job_id"]
+    while True:
+        await asyncio.sleep(0.05)
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["state"] == "succeeded":
+            return 200
+        if job["state"] == "failed":
+            return 500
+
+
+SCENARIOS = {"search": search_request, "ask": ask_request, "ingest": ingest_request}
+
+
+async def run_scenario(api_url: str, name: str, requests: int, concurrency: int, args) -> Dict:
+    send = SCENARIOS[name]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient):
+        for _ in counter:
+            i = next(_request_ids)
+            start = time.perf_counter()
+            try:
+                status = str(await send(client, i, args))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=api_url, timeout=args.timeout, limits=limits
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "statuses": statuses,
+        "duration_s": round(duration, 2),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(latencies[-1], 1) if latencies else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PRACTICE_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenarios", default="search,ask,ingest")
+    parser.add_argument("--concurrency", default="1,8,32", help="Níveis, separados por vírgula")
+    parser.add_argument("--requests", type=int, default=200, help="Requisições por nível")
+    parser.add_argument("--ingest-requests", type=int, default=20, help="Arquivos por nível")
+    parser.add_argument("--ingest-paragraphs", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat-questions", action="store_true", help="Permite hits no cache de respostas")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--llm-ttft-ms", type=float, default=200)
+    parser.add_argument("--llm-tokens", type=int, default=50)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE extra para a API")
+    parser.add_argument("--api-url", default=None, help="Usa uma API já rodando (não sobe nada)")
+    parser.add_argument("--api-pid", type=int, default=None, help="PID da API externa (memória)")
+    parser.add_argument("--ready-timeout", type=float, default=600)
+    parser.add_argument("--out", default=None, help="Arquivo JSON com o resultado")
+    args = parser.parse_args()
+
+    process = None
+    api_url, api_pid = args.api_url, args.api_pid
+    if api_url is None:
+        llm_url = start_stub_llm(args.llm_ttft_ms, args.llm_tokens, args.llm_token_ms)
+        overrides = dict(item.split("=", 1) for item in args.env)
+        if (
+            int(overrides.get("API_WORKERS", "1")) > 1
+            and overrides.get("QDRANT_HOST", ":memory:") == ":memory:"
+        ):
+            parser.error(
+                "API_WORKERS>1 precisa de um Qdrant real (cada worker teria o seu "
+                "Qdrant em memória): use também --env QDRANT_HOST=localhost"
+            )
+        process, api_url = start_api(llm_url, overrides)
+        api_pid = process.pid
+
+    try:
+        wait_ready(api_url, args.ready_timeout, process)
+        idle = memory_mb(api_pid)
+        results = []
+        for name in args.scenarios.split(","):
+            requests = args.ingest_requests if name == "ingest" else args.requests
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                result = asyncio.run(run_scenario(api_url, name, requests, concurrency, args))
+                result.update(memory_mb(api_pid))
+                results.append(result)
+                print(
+                    f"{name:<7} c={concurrency:<4} ok={result['ok']:<5} "
+                    f"rps={result['throughput_rps']:<8} p50={result['p50_ms']} "
+                    f"p95={result['p95_ms']} p99={result['p99_ms']} ms "
+                    f"rss={result['rss_mb']} MB",
+                    flush=True,
+                )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "api_url": args.api_url or "local",
+            "idle_memory": idle,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark: recall@k x memória x latência para cada perfil de coleção (COLLECTION_PROFILE).
+
+Uso (a partir de mlops/CH2/practice, com o Qdrant do docker compose rodando):
+
+    python benchmarks/quantization_benchmark.py --synthetic 100000 --k 5
+    python benchmarks/quantization_benchmark.py --profiles scalar,binary --on-disk --hnsw-ef 128
+
+A base é o MEDICAL_DATA embedado com o modelo real + vetores sintéticos gerados
+como perturbações desses embeddings (mesma distribuição "em clusters", sem o
+custo de embedar milhões de textos). O gabarito é a busca exata (numpy) sobre os
+vetores float32; recall@k = fração do top-k exato retornada por cada perfil.
+
+A memória é uma estimativa do que fica em RAM (vetores originais, cópia
+quantizada e grafo HNSW), já que o Qdrant não expõe RAM por coleção.
+O Qdrant local (`--qdrant-host :memory:`) ignora quantização: use um servidor.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from fastembed import TextEmbedding  # noqa: E402
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.http import models as qmodels  # noqa: E402
+from quantization import PROFILES, get_profile  # noqa: E402
+from services import MEDICAL_DATA  # noqa: E402
+
+QUESTIONS = [
+    "Quais são os sintomas da dengue?",
+    "Como funciona o protocolo de Manchester?",
+    "O que é hipertensão arterial?",
+    "Qual a diferença entre AVC isquêmico e hemorrágico?",
+    "Quais doenças são transmitidas pelo Aedes aegypti?",
+    "O que causa a insuficiência renal crônica?",
+    "Sintomas de infarto agudo do miocárdio",
+    "Tratamento de asma e DPOC",
+]
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def build_dataset(embedder: TextEmbedding, synthetic: int, queries: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed)
+    base = np.array(list(embedder.embed([text for text, _ in MEDICAL_DATA])), dtype=np.float32)
+    parents = base[rng.integers(0, len(base), synthetic)]
+    scaled = parents + rng.normal(0, noise, parents.shape).astype(np.float32)
+    vectors = normalize(np.vstack([base, scaled]))
+
+    real_queries = np.array(list(embedder.query_embed(QUESTIONS)), dtype=np.float32)
+    picked = vectors[rng.integers(0, len(vectors), max(0, queries - len(real_queries)))]
+    noisy = picked + rng.normal(0, noise, picked.shape).astype(np.float32)
+    query_vectors = normalize(np.vstack([real_queries, noisy]))[:queries]
+    return vectors, query_vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def estimate_ram_mb(profile, n: int, dim: int) -> float:
+    originals = 0 if profile.on_disk else n * dim * 4
+    quantized = {"scalar": n * dim, "binary": n * dim / 8}.get(profile.quantization, 0)
+    # Layer-0 links dominate the graph: ~2*m neighbours of 4 bytes each
+    graph = n * 2 * (profile.hnsw_m or 16) * 4
+    return round((originals + quantized + graph) / 1024 / 1024, 1)
+
+
+def wait_indexed(client: QdrantClient, name: str, timeout: float = 600) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get_collection(name)
+        if info.status == qmodels.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"Collection {name} not indexed after {timeout:.0f}s")
+
+
+def run_profile(client, profile, vectors, queries, truth, k, batch_size):
+    name = f"benchmark_{profile.name}"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=profile.vectors_config(vectors.shape[1]),
+        quantization_config=profile.quantization_config(),
+        hnsw_config=profile.hnsw_config(),
+        # Build the HNSW index even for small runs
+        optimizers_config=qmodels.OptimizersConfigDiff(indexing_threshold=1000),
+    )
+
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        batch = vectors[i : i + batch_size]
+        client.upsert(
+            collection_name=name,
+            points=qmodels.Batch(ids=list(range(i, i + len(batch))), vectors=batch.tolist()),
+            wait=False,
+        )
+    wait_indexed(client, name)
+    index_seconds = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    params = profile.search_params()
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        points = client.query_points(
+            collection_name=name,
+            query=query.tolist(),
+            search_params=params,
+            limit=k,
+            with_payload=False,
+        ).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({p.id for p in points} & set(expected.tolist()))
+    client.delete_collection(name)
+
+    latencies.sort()
+    return {
+        **profile.describe(),
+        "points": len(vectors),
+        f"recall@{k}": round(hits / (len(queries) * k), 4),
+        "latency_p50_ms": round(statistics.median(latencies), 2),
+        "latency_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "est_ram_mb": estimate_ram_mb(profile, len(vectors), vectors.shape[1]),
+        "index_seconds": round(index_seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--synthetic", type=int, default=50000, help="Vetores sintéticos extras")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.05, help="Desvio das perturbações")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--on-disk", action="store_true", help="Vetores originais em disco")
+    parser.add_argument("--oversampling", type=float, default=None)
+    parser.add_argument("--hnsw-m", type=int, default=None)
+    parser.add_argument("--hnsw-ef-construct", type=int, default=None)
+    parser.add_argument("--hnsw-ef", type=int, default=None)
+    parser.add_argument("--qdrant-host", default="localhost", help='":memory:" = Qdrant local')
+    parser.add_argument("--qdrant-port", type=int, default=6333)
+    parser.add_argument("--json", default=None, help="Salva o resultado neste arquivo")
+    args = parser.parse_args()
+
+    # Profiles read their knobs from the same env vars as the API
+    overrides = {
+        "VECTORS_ON_DISK": "true" if args.on_disk else None,
+        "QUANTIZATION_OVERSAMPLING": args.oversampling,
+        "HNSW_M": args.hnsw_m,
+        "HNSW_EF_CONSTRUCT": args.hnsw_ef_construct,
+        "HNSW_EF": args.hnsw_ef,
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            os.environ[key] = str(value)
+
+    if args.qdrant_host == ":memory:":
+        print("Aviso: o Qdrant local ignora quantização; os perfis terão o mesmo resultado.")
+        client = QdrantClient(":memory:")
+    else:
+        client = QdrantClient(host=args.qdrant_host, port=args.qdrant_port)
+
+    embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+    vectors, queries = build_dataset(
+        embedder, args.synthetic, args.queries, args.noise, args.seed
+    )
+    truth = exact_top_k(vectors, queries, args.k)
+
+    results = [
+        run_profile(client, get_profile(name), vectors, queries, truth, args.k, args.batch_size)
+        for name in args.profiles.split(",")
+    ]
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+    recall = f"recall@{args.k}"
+    print(
+        f"{'profile':<9} {'points':>8} {recall:>9} {'p50 ms':>7} {'p95 ms':>7} "
+        f"{'RAM MB':>7} {'index s':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['profile']:<9} {r['points']:>8} {r[recall]:>9} {r['latency_p50_ms']:>7} "
+            f"{r['latency_p95_ms']:>7} {r['est_ram_mb']:>7} {r['index_seconds']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+LLM falso compatível com a API da OpenAI, com latência configurável.
+
+Substitui o `llm_service` (llama.cpp) nos benchmarks, para medir a API sem o
+custo/variância do modelo. Uso isolado:
+
+    python benchmarks/stub_llm.py --port 9000 --ttft-ms 200 --tokens 50 --token-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def create_app(ttft_ms: float = 200, tokens: int = 50, token_ms: float = 20) -> FastAPI:
+    """`ttft_ms` until the first token, then `tokens` tokens every `token_ms`."""
+    app = FastAPI(title="Stub LLM")
+    app.state.calls = 0
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        words = [f"tok{i}" for i in range(tokens)]
+
+        if not body.get("stream"):
+            await asyncio.sleep((ttft_ms + tokens * token_ms) / 1000)
+            return {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": " ".join(words)}}
+                ],
+            }
+
+        async def events():
+            await asyncio.sleep(ttft_ms / 1000)
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(token_ms / 1000)
+                chunk = {"choices": [{"index": 0, "delta": {"content": f"{word} "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(
+        create_app(args.ttft_ms, args.tokens, args.token_ms),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -33,7 +33,8 @@ async function checkStatus() {
 
         if (res.ok) {
             const data = await res.json();
-            updateStatus('api-status', 'online');
+            // API answers while models are still warming up
+            updateStatus('api-status', data.status === 'starting' ? 'processing' : 'online');
 
             // Granular Status
             if (data.services) {
@@ -80,18 +81,48 @@ async function sendMessage() {
     isGenerating = true; // Pause health checks
 
     try {
-        const res = await fetch(`${BASE_URL}/ask`, {
+        const res = await fetch(`${BASE_URL}/ask/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ question: text })
+            // debug: the education panel shows the exact prompt sent to the LLM
+            body: JSON.stringify({ question: text, debug: true })
         });
+        if (!res.ok || !res.body) throw new Error(`Status ${res.status}`);
+
+        // Server-Sent Events: docs -> token* -> done | error
+        const bubble = addMessage('', 'system');
+        const data = { answer: '', retrieved_docs: [], built_prompt: '' };
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let sep;
+            while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                const { event, payload } = parseSSE(buffer.slice(0, sep));
+                buffer = buffer.slice(sep + 2);
+
+                if (event === 'docs') {
+                    data.retrieved_docs = payload.retrieved_docs;
+                    data.built_prompt = payload.built_prompt || '';
+                    renderDebug(data);
+                } else if (event === 'token') {
+                    data.answer += payload.text;
+                    bubble.textContent = data.answer;
+                } else if (event === 'error') {
+                    data.answer = payload.detail;
+                    bubble.textContent = data.answer;
+                } else if (event === 'done') {
+                    console.log(`TTFT: ${payload.ttft_ms} ms | Total: ${payload.total_ms} ms | Prompt: ${payload.prompt_tokens} tokens`);
+                }
+            }
+        }
 
-        const data = await res.json();
-
-        // 1. Update Chat
-        addMessage(data.answer, 'system');
-
-        // 2. Update Debug Visualization
+        // Final Debug Visualization
         renderDebug(data);
 
     } catch (e) {
@@ -103,6 +134,16 @@ async function sendMessage() {
     }
 }
 
+function parseSSE(block) {
+    let event = 'message';
+    let dataLines = [];
+    block.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    });
+    return { event, payload: JSON.parse(dataLines.join('\n') || '{}') };
+}
+
 function addMessage(text, sender) {
     const div = document.createElement('div');
     div.className = `message ${sender}`;
@@ -112,6 +153,7 @@ function addMessage(text, sender) {
     `;
     document.getElementById('chat-messages').appendChild(div);
     div.scrollIntoView({ behavior: 'smooth' });
+    return div.querySelector('.bubble');
 }
 
 function renderDebug(data) {
@@ -166,11 +208,22 @@ async function ingestData() {
                 method: 'POST',
                 body: formData
             });
-            if (res.ok) success = true;
+            if (res.ok) {
+                // Ingestion runs in background: poll the job until it finishes
+                const job = await waitForJob((await res.json()).job_id, status);
+                if (job.state === 'succeeded') success = true;
+                else {
+                    status.innerText = `Erro no arquivo: ${job.error || 'falha na ingestão'}`;
+                    status.style.color = "var(--error)";
+                    return;
+                }
+            }
             else {
                 let errDetail = "Erro desconhecido";
                 if (res.status === 413) {
                     errDetail = "Arquivo muito grande (limite excedido).";
+                } else if (res.status === 429) {
+                    errDetail = "Fila de ingestão cheia, tente novamente em instantes.";
                 } else {
                     try {
                         const err = await res.json();
@@ -200,6 +253,23 @@ async function ingestData() {
     }
 }
 
+async function waitForJob(jobId, status) {
+    while (true) {
+        const res = await fetch(`${BASE_URL}/jobs/${jobId}`);
+        if (!res.ok) {
+            // 404: job forgotten (API restarted or history trimmed)
+            const error = res.status === 404 ? 'job não encontrado' : `Erro no servidor (Status: ${res.status})`;
+            return { state: 'failed', error };
+        }
+        const job = await res.json();
+        if (job.state === 'succeeded' || job.state === 'failed') return job;
+
+        const progress = job.chunks_total ? ` (${job.chunks_processed}/${job.chunks_total} trechos)` : '';
+        status.innerText = job.state === 'queued' ? "Na fila..." : `Indexando${progress}...`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 // Enter key support
 document.getElementById('user-input').addEventListener('keypress', (e) => {
     if (e.key === 'Enter') sendMessage();
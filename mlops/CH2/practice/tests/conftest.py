@@ -0,0 +1,42 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# The app modules import each other by bare name (they run from app/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+# Local in-process Qdrant, dense-only: no server and no BM25 model needed
+os.environ.setdefault("QDRANT_HOST", ":memory:")
+os.environ.setdefault("HYBRID_SEARCH", "false")
+
+
+class FakeEmbedder:
+    """Stands in for fastembed's TextEmbedding: deterministic 384-d vectors."""
+
+    def __init__(self, *args, **kwargs):
+        self.fail = False
+        self.calls = 0
+
+    def embed(self, documents, batch_size=None, **kwargs):
+        documents = [documents] if isinstance(documents, str) else list(documents)
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("embedder down")
+        for doc in documents:
+            rng = np.random.default_rng(abs(hash(doc)) % 2**32)
+            yield rng.standard_normal(384).astype(np.float32)
+
+    query_embed = embed
+
+
+@pytest.fixture
+def vector_db(monkeypatch):
+    import services
+
+    monkeypatch.setattr(services, "TextEmbedding", FakeEmbedder)
+    service = services.VectorDbService()
+    service.ensure_collection()
+    return service
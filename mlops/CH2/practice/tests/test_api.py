@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def api(monkeypatch):
+    import main
+    from health import CircuitBreaker
+
+    vector_db = SimpleNamespace(breaker=CircuitBreaker("qdrant", failure_threshold=1))
+    llm = SimpleNamespace(breaker=CircuitBreaker("llm"))
+    orchestrator = SimpleNamespace(ready=True, vector_db=vector_db, llm_service=llm)
+    monkeypatch.setattr(main, "orchestrator", orchestrator)
+    # No `with`: the lifespan (model loading) does not run
+    return TestClient(main.app), orchestrator
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/search", {"query": "dor no peito"}),
+        ("/search/batch", {"queries": ["dor no peito"]}),
+        ("/ask", {"question": "dor no peito"}),
+        ("/ask/batch", {"questions": ["dor no peito"]}),
+        ("/ask/stream", {"question": "dor no peito"}),
+    ],
+)
+def test_open_vector_db_breaker_returns_503(api, path, body):
+    client, orchestrator = api
+    orchestrator.vector_db.breaker.record_failure()
+
+    r = client.post(path, json=body)
+
+    assert r.status_code == 503
+    assert int(r.headers["Retry-After"]) >= 1
+
+
+def test_batch_search_breaker_opened_mid_request_returns_503(api):
+    from health import CircuitOpenError
+
+    client, orchestrator = api
+
+    def search_batch(*args):
+        raise CircuitOpenError("Qdrant unavailable (circuit open)")
+
+    orchestrator.vector_db.search_batch = search_batch
+    r = client.post("/search/batch", json={"queries": ["dor no peito"]})
+
+    assert r.status_code == 503
+    assert "Retry-After" in r.headers
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import cache as cache_module
+from cache import AnswerCache, TTLCache
+
+
+def test_ttl_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("q", [0.1, 0.2])
+
+    now[0] += 59
+    assert cache.get("q") == [0.1, 0.2]
+    now[0] += 2
+    assert cache.get("q") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_lru_evicts_least_recently_used_without_ttl():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_disk_cache_survives_restart_and_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    first = AnswerCache(maxsize=2, path=path)
+    first.set("a", ("answer a", ""))
+    time.sleep(0.01)
+    first.set("b", ("answer b", ""))
+
+    second = AnswerCache(maxsize=2, path=path)
+    time.sleep(0.01)
+    assert second.get("a") == ("answer a", "")  # From disk: "a" is now the most recent
+    second.set("c", ("answer c", ""))
+
+    third = AnswerCache(maxsize=2, path=path)
+    assert third.get("b") is None
+    assert third.get("a") == ("answer a", "")
+    assert third.get("c") == ("answer c", "")
+
+
+def test_disk_hit_does_not_commit(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    AnswerCache(path=path).set("a", ("answer a", ""))
+    cache = AnswerCache(path=path)
+    commits = []
+    cache._db = _CommitSpy(cache._db, commits)
+
+    assert cache.get("a") == ("answer a", "")
+    assert commits == []
+
+
+def test_async_access_runs_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite"))
+    threads = []
+    for name in ("_read", "_write"):
+        original = getattr(cache, name)
+
+        def spy(*args, original=original):
+            threads.append(threading.current_thread())
+            return original(*args)
+
+        monkeypatch.setattr(cache, name, spy)
+
+    async def run():
+        await cache.aset("a", ("answer a", ""))
+        cache.memory.clear()
+        return await cache.aget("a")
+
+    assert asyncio.run(run()) == ("answer a", "")
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_locked_database_falls_back_to_memory(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "answers.sqlite")
+    cache = AnswerCache(path=path)
+    cache.set("a", ("answer a", ""))
+    # Another worker holds the file
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+
+        async def run():
+            await cache.aset("b", ("answer b", ""))
+            return await cache.aget("b")
+
+        assert asyncio.run(run()) == ("answer b", "")
+        cache.memory.clear()
+        assert cache.get("a") is None  # disk unreadable: a miss, not an error
+        cache.clear()
+    finally:
+        other.rollback()
+        other.close()
+
+    # Once the lock is gone the disk is used again
+    cache.set("c", ("answer c", ""))
+    assert AnswerCache(path=path).get("c") == ("answer c", "")
+
+
+class _CommitSpy:
+    def __init__(self, db, commits):
+        self._db = db
+        self._commits = commits
+
+    def commit(self):
+        self._commits.append(True)
+        self._db.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
@@ -0,0 +1,62 @@
+import string
+
+import pytest
+from chunking import Chunker, StructuredChunker, estimate_tokens, load_token_counter
+
+
+@pytest.fixture(scope="module")
+def char_tokenizer(tmp_path_factory):
+    """WordPiece tokenizer whose vocabulary is single characters: 1 token per letter."""
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    chars = string.ascii_lowercase + string.digits + "áéíóúãõç"
+    vocab = {"[UNK]": 0}
+    for c in chars:
+        vocab.setdefault(c, len(vocab))
+        vocab.setdefault(f"##{c}", len(vocab))
+    for c in string.punctuation:
+        vocab.setdefault(c, len(vocab))
+    tokenizer = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    path = tmp_path_factory.mktemp("tokenizer") / "tokenizer.json"
+    tokenizer.save(str(path))
+    return load_token_counter(str(path))
+
+
+DOCUMENT = "\n".join(
+    [
+        "# PROTOCOLO DE TRIAGEM",
+        "A classificação de risco orienta o atendimento na emergência. " * 12,
+        "- Vermelho: emergência, atendimento imediato.",
+        "- Laranja: muito urgente, até dez minutos.",
+        "",
+        "2.1 Sinais de alerta",
+        "Hipotensionrefrataria" * 40,
+        "Pacientes com dor torácica, dispneia ou rebaixamento do nível de consciência "
+        "devem ser reavaliados continuamente pela equipe de enfermagem. " * 8,
+    ]
+)
+
+
+@pytest.mark.parametrize("counter", ["estimate", "tokenizer"])
+def test_no_chunk_exceeds_max_tokens(counter, char_tokenizer):
+    count = char_tokenizer if counter == "tokenizer" else estimate_tokens
+    chunker = StructuredChunker(max_tokens=64, overlap_tokens=16, token_counter=count)
+
+    chunks = chunker.split(DOCUMENT)
+
+    assert chunks
+    assert max(count(chunk) for chunk in chunks) <= 64
+    # Nothing is lost: every word (markdown markers aside) appears in some chunk
+    joined = " ".join(chunks)
+    assert all(word in joined for word in DOCUMENT.split() if word != "#" and len(word) < 20)
+
+
+def test_missing_tokenizer_falls_back_to_estimate(tmp_path):
+    assert load_token_counter(str(tmp_path / "missing.json")) is estimate_tokens
+    assert load_token_counter(None) is estimate_tokens
+
+
+def test_chunker_is_abstract():
+    with pytest.raises(TypeError):
+        Chunker()
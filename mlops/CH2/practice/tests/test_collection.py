@@ -0,0 +1,87 @@
+class _IndexSpy:
+    """Wraps the Qdrant client and records the payload fields it indexes."""
+
+    def __init__(self, client):
+        self._client = client
+        self.indexed = []
+
+    def create_payload_index(self, collection_name, field_name, field_schema):
+        self.indexed.append(field_name)
+        return self._client.create_payload_index(
+            collection_name=collection_name, field_name=field_name, field_schema=field_schema
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def test_payload_indexes_rebuilt_after_drop(vector_db):
+    vector_db.qdrant = spy = _IndexSpy(vector_db.qdrant)
+
+    vector_db.drop_collection()
+    vector_db.ingest(["Hipertensão: pressão arterial elevada."], source="a.txt")
+
+    assert sorted(spy.indexed) == sorted(vector_db.PAYLOAD_INDEXES)
+
+
+def test_collection_recreated_behind_the_service(vector_db):
+    vector_db.qdrant = spy = _IndexSpy(vector_db.qdrant)
+
+    # e.g. deleted by another process, then recreated by ensure_collection
+    vector_db.qdrant.delete_collection(vector_db.collection_name)
+    vector_db.ensure_collection()
+    vector_db.ensure_collection()
+
+    assert sorted(spy.indexed) == sorted(vector_db.PAYLOAD_INDEXES)
+
+
+def stored_specialties(service):
+    points, _ = service.qdrant.scroll(service.collection_name, limit=100, with_payload=True)
+    return {point.payload["text"]: point.payload.get("specialty") for point in points}
+
+
+def test_reupload_with_new_metadata_updates_stored_points(vector_db):
+    texts = ["Asma: inflamação crônica das vias aéreas.", "Tosse seca persistente."]
+    assert vector_db.ingest(texts, "asma.txt", metadata={"specialty": "Clínica"}) == (2, 0)
+
+    inserted, skipped = vector_db.ingest(texts, "asma.txt", metadata={"specialty": "Pneumologia"})
+
+    # Same chunks: not re-embedded, but the filterable payload follows the upload
+    assert (inserted, skipped) == (0, 2)
+    assert vector_db.qdrant.count(vector_db.collection_name).count == 2
+    assert set(stored_specialties(vector_db).values()) == {"Pneumologia"}
+    hits = vector_db.search(texts[0], top_k=5, filters={"specialty": "Pneumologia"})
+    assert {hit["text"] for hit in hits} == set(texts)
+
+
+def test_reingest_skips_stored_and_repeated_chunks(vector_db):
+    texts = ["Dengue: febre alta.", "Asma: falta de ar.", "Dengue:   febre alta."]
+    embedded = vector_db.embedder.calls
+
+    # The third text is the first one after whitespace normalization
+    assert vector_db.ingest(texts, "triagem.txt") == (2, 1)
+    calls_first = vector_db.embedder.calls - embedded
+
+    assert vector_db.ingest(texts + ["Gripe: tosse."], "triagem.txt") == (1, 3)
+    assert vector_db.qdrant.count(vector_db.collection_name).count == 3
+    # Only the new chunk was embedded the second time
+    assert vector_db.embedder.calls - embedded == calls_first + 1
+
+
+def test_same_text_from_another_source_is_a_new_point(vector_db):
+    assert vector_db.ingest(["Dengue: febre alta."], "a.txt") == (1, 0)
+    assert vector_db.ingest(["Dengue: febre alta."], "b.txt") == (1, 0)
+
+
+def test_seed_does_not_sleep_after_last_attempt(vector_db, monkeypatch):
+    import services
+
+    sleeps = []
+    monkeypatch.setattr(services.time, "sleep", sleeps.append)
+    vector_db.embedder.fail = True
+
+    assert services.seed_database(vector_db, retries=3) is False
+    assert sleeps == [2, 4]
+
+    vector_db.embedder.fail = False
+    assert services.seed_database(vector_db, retries=3) is True
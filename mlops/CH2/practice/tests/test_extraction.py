@@ -0,0 +1,54 @@
+import os
+import time
+
+import pytest
+from extraction import ExtractionEngine, ExtractionError
+
+
+# Run inside the pool's (spawned) workers: must be top-level
+def _crash():
+    os._exit(1)
+
+
+def _sleep_forever():
+    time.sleep(600)
+
+
+def _pid():
+    return os.getpid()
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setenv("EXTRACT_WORKERS", "1")
+    monkeypatch.setenv("EXTRACT_WORKER_MAX_MB", "0")
+    engine = ExtractionEngine()
+    yield engine
+    engine.shutdown()
+
+
+def test_crashed_worker_fails_the_file_and_pool_is_rebuilt(engine):
+    with pytest.raises(ExtractionError):
+        engine._run([(_crash, ())])
+    assert engine._run([(pow, (2, 10))]) == [1024]
+    assert engine.stats()["pool_restarts"] >= 1
+
+
+def test_timeout_kills_the_running_worker(engine):
+    engine.timeout = 2
+    [worker] = engine._run([(_pid, ())])
+
+    with pytest.raises(TimeoutError):
+        engine._run([(_sleep_forever, ())])
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            os.kill(worker, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("timed-out extraction worker is still running")
+    assert engine.stats()["timeouts"] == 1
+    assert engine._run([(pow, (3, 2))]) == [9]
@@ -0,0 +1,70 @@
+import zlib
+
+import numpy as np
+import pytest
+from conftest import FakeEmbedder
+
+
+class _Sparse:
+    def __init__(self, indices, values):
+        self.indices = np.array(indices, dtype=np.int64)
+        self.values = np.array(values, dtype=np.float32)
+
+
+class FakeBM25:
+    """Stands in for SparseTextEmbedding: one dimension per word, weight 1."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def embed(self, documents, batch_size=None, **kwargs):
+        documents = [documents] if isinstance(documents, str) else list(documents)
+        for doc in documents:
+            terms = sorted({zlib.crc32(w.strip(".:,").casefold().encode()) for w in doc.split()})
+            yield _Sparse(terms, [1.0] * len(terms))
+
+    query_embed = embed
+
+
+@pytest.fixture
+def hybrid_db(monkeypatch):
+    import services
+
+    monkeypatch.setenv("HYBRID_SEARCH", "true")
+    monkeypatch.setenv("QDRANT_COLLECTION", "hybrid_test")
+    monkeypatch.setattr(services, "TextEmbedding", FakeEmbedder)
+    monkeypatch.setattr(services, "SparseTextEmbedding", FakeBM25)
+    service = services.VectorDbService()
+    service.ensure_collection()
+    return service
+
+
+TEXTS = [f"Protocolo clínico número {i} para triagem geral." for i in range(10)] + [
+    "Exacerbação de DPOC: broncodilatador e oxigênio."
+]
+
+
+def test_rrf_puts_the_exact_term_match_first(hybrid_db):
+    assert hybrid_db.hybrid_ready
+    hybrid_db.ingest(TEXTS, source="protocolos.txt")
+
+    # The fake dense vectors are random: only the BM25 side knows about "DPOC"
+    hybrid = hybrid_db.search("DPOC", top_k=3, mode="hybrid")
+    assert hybrid[0]["text"] == TEXTS[-1]
+    assert len(hybrid) == 3
+
+    batch = hybrid_db.search_batch(["DPOC"], top_k=3, mode="hybrid")
+    assert batch[0][0]["text"] == TEXTS[-1]
+
+
+def test_dense_mode_ranks_by_dense_similarity_only(hybrid_db):
+    hybrid_db.ingest(TEXTS, source="protocolos.txt")
+    embedder = FakeEmbedder()
+    query = next(embedder.embed("DPOC"))
+
+    def cosine(text):
+        vector = next(embedder.embed(text))
+        return float(vector @ query / (np.linalg.norm(vector) * np.linalg.norm(query)))
+
+    expected = sorted(TEXTS, key=cosine, reverse=True)[:3]
+    assert [doc["text"] for doc in hybrid_db.search("DPOC", top_k=3, mode="dense")] == expected
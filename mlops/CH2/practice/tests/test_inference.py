@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Listener
+
+import pytest
+from health import OPEN, CircuitBreaker, CircuitOpenError
+from inference import InferenceClient, _Batcher
+
+AUTHKEY = b"test-key"
+
+
+@pytest.fixture
+def address():
+    # AF_UNIX paths are short (~100 bytes): keep it under /tmp
+    directory = tempfile.mkdtemp(prefix="rag-inf-")
+    yield os.path.join(directory, "s.sock")
+
+
+def serve_once(address, handle):
+    """Fake InferenceServer: accepts one connection and runs `handle(conn)`."""
+    listener = Listener(address, family="AF_UNIX", authkey=AUTHKEY)
+
+    def run():
+        with listener:
+            conn = listener.accept()
+            handle(conn)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def make_client(address, **kwargs):
+    client = InferenceClient(address, AUTHKEY, **kwargs)
+    client.breaker = CircuitBreaker("inference", failure_threshold=1, reset_timeout=60)
+    return client
+
+
+def test_batcher_merges_requests_and_splits_results():
+    batcher = _Batcher("embed", lambda items: [item * 10 for item in items], 64, 0.05)
+    replies = {}
+    # Queued before the loop starts: all three land in one batch
+    for name, items in (("a", [1, 2]), ("b", [3]), ("c", [4, 5, 6])):
+        batcher.submit(items, lambda ok, result, name=name: replies.setdefault(name, (ok, result)))
+    threading.Thread(target=batcher.run_forever, daemon=True).start()
+
+    deadline = time.monotonic() + 5
+    while len(replies) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert replies == {"a": (True, [10, 20]), "b": (True, [30]), "c": (True, [40, 50, 60])}
+    assert batcher.stats()["batches"] == 1
+
+
+def test_replies_are_matched_by_request_id(address):
+    def reply_in_reverse(conn):
+        first, second = conn.recv(), conn.recv()
+        for request_id, _, payload in (second, first):
+            conn.send((request_id, True, [f"{text}!" for text in payload]))
+        conn.recv()  # Hold the connection until the client closes
+
+    serve_once(address, reply_in_reverse)
+    client = make_client(address, timeout=5)
+    client._connection()  # Connect first: both calls must share one connection
+    results = {}
+
+    def call(text):
+        results[text] = client.call("embed", [text])
+
+    threads = [threading.Thread(target=call, args=(text,)) for text in ("febre", "tosse")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == {"febre": ["febre!"], "tosse": ["tosse!"]}
+
+
+def test_dropped_connection_fails_pending_calls(address):
+    def drop(conn):
+        conn.recv()
+        conn.close()
+
+    serve_once(address, drop)
+    client = make_client(address, timeout=30)
+
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        client.call("embed", ["febre"])
+
+    assert time.monotonic() - started < 5  # Not the call timeout
+    assert client._pending == {}
+    assert client.breaker.state == OPEN
+
+
+def test_open_breaker_fails_fast_without_connecting(address):
+    client = make_client(address, connect_timeout=0.3)
+    with pytest.raises(ConnectionError):
+        client.call("embed", ["febre"])  # No server: opens the breaker
+
+    started = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        client.call("embed", ["febre"])
+    assert time.monotonic() - started < 0.1
+
+
+def test_connecting_does_not_hold_the_lock(address):
+    client = make_client(address, connect_timeout=1)
+    caller = threading.Thread(target=lambda: pytest.raises(ConnectionError, client._connection))
+    caller.start()
+    time.sleep(0.2)  # Now retrying the connection
+
+    assert client._lock.acquire(timeout=0.1)
+    client._lock.release()
+    caller.join()
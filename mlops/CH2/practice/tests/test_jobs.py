@@ -0,0 +1,67 @@
+import asyncio
+
+from jobs import IngestJobQueue
+from metrics import REGISTRY
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+def test_queue_depth_and_job_latency_are_exported():
+    def handler(content, filename, on_progress, metadata=None):
+        if filename == "bad.txt":
+            raise ValueError("unreadable")
+        return 3, 1
+
+    async def scenario():
+        queue = IngestJobQueue(handler, workers=1)
+        queue.submit(b"a", "a.txt")
+        queue.submit(b"b", "bad.txt")
+        # Nothing has run yet: both jobs are waiting
+        assert sample("rag_ingest_jobs_queued") == 2
+        queue.start()
+        await queue.queue.join()
+        await queue.stop()
+
+    succeeded = sample("rag_ingest_job_duration_seconds_count", {"state": "succeeded"})
+    failed = sample("rag_ingest_job_duration_seconds_count", {"state": "failed"})
+    waited = sample("rag_ingest_job_wait_seconds_count")
+
+    asyncio.run(scenario())
+
+    assert sample("rag_ingest_jobs_queued") == 0
+    assert sample("rag_ingest_jobs_running") == 0
+    assert sample("rag_ingest_job_wait_seconds_count") == waited + 2
+    assert sample("rag_ingest_job_duration_seconds_count", {"state": "succeeded"}) == succeeded + 1
+    assert sample("rag_ingest_job_duration_seconds_count", {"state": "failed"}) == failed + 1
+
+
+def test_shutdown_marks_unfinished_jobs_failed(tmp_path):
+    import json
+    import threading
+
+    release = threading.Event()
+
+    def handler(content, filename, on_progress, metadata=None):
+        release.wait(timeout=5)
+        return 1, 0
+
+    async def scenario():
+        queue = IngestJobQueue(handler, workers=1, state_dir=str(tmp_path))
+        running = queue.submit(b"a", "a.txt")
+        queued = queue.submit(b"b", "b.txt")
+        queue.start()
+        while running["state"] != "running":
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        release.set()
+        return queue, running["job_id"], queued["job_id"]
+
+    queue, running_id, queued_id = asyncio.run(scenario())
+
+    for job_id in (running_id, queued_id):
+        saved = json.loads((tmp_path / f"{job_id}.json").read_text())
+        assert saved["state"] == "failed"
+        assert saved["error"] == queue.INTERRUPTED
+        assert saved["finished_at"] is not None
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+from prompting import PromptBuilder
+
+
+def words(text):
+    return len(text.split())
+
+
+def docs(*texts):
+    return [{"text": text, "source": "a.txt"} for text in texts]
+
+
+@pytest.mark.parametrize("budget", [8, 20, 50, 120, 400])
+def test_context_never_exceeds_the_budget(budget):
+    rng = random.Random(budget)
+    vocabulary = "febre dor tosse pressão glicose exame dose repouso sangue pulmão".split()
+    texts = [
+        " ".join(
+            " ".join(rng.choices(vocabulary, k=rng.randint(3, 12))) + "."
+            for _ in range(rng.randint(1, 6))
+        )
+        for _ in range(30)
+    ]
+    builder = PromptBuilder(context_tokens=budget, min_chunk_tokens=4, token_counter=words)
+
+    lines = builder._compress(texts)
+
+    assert sum(words(line) + 1 for line in lines) <= budget
+
+
+def test_sentences_repeated_across_chunks_are_dropped():
+    builder = PromptBuilder(context_tokens=200, token_counter=words)
+    prompt = builder.build(
+        "Sintomas?",
+        docs(
+            "Dengue causa febre alta. Há dor atrás dos olhos.",
+            "dengue  CAUSA febre alta. Manchas vermelhas podem surgir.",  # overlap
+            "Há dor atrás dos olhos.",  # nothing new: dropped entirely
+        ),
+    )
+
+    context = prompt.messages[0]["content"]
+    assert context.count("febre alta") == 1
+    assert context.count("dor atrás dos olhos") == 1
+    assert "Manchas vermelhas podem surgir." in context
+    assert (prompt.used_docs, prompt.dropped_docs) == (2, 1)
+
+
+def test_first_chunk_over_budget_is_cut_at_a_sentence_boundary():
+    builder = PromptBuilder(context_tokens=12, min_chunk_tokens=3, token_counter=words)
+
+    lines = builder._compress(
+        ["Primeiro trecho curto.", "Frase um do segundo. Frase dois do segundo. Frase três."]
+    )
+
+    # "- Primeiro trecho curto." = 4 + 1; 7 left: only "Frase um do segundo." fits
+    assert lines == ["- Primeiro trecho curto.", "- Frase um do segundo."]
+
+
+def test_no_partial_chunk_below_min_chunk_tokens():
+    builder = PromptBuilder(context_tokens=8, min_chunk_tokens=5, token_counter=words)
+
+    lines = builder._compress(["Um trecho de cinco palavras.", "Outro trecho. Mais um."])
+
+    assert lines == ["- Um trecho de cinco palavras."]
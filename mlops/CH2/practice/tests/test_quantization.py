@@ -0,0 +1,22 @@
+from quantization import get_profile
+
+
+def test_profiles_carry_their_own_hnsw_defaults(monkeypatch):
+    for name in ("HNSW_M", "HNSW_EF_CONSTRUCT", "HNSW_EF"):
+        monkeypatch.delenv(name, raising=False)
+
+    float32, binary = get_profile("float32"), get_profile("binary")
+
+    assert binary.hnsw_m > float32.hnsw_m
+    assert binary.search_params().hnsw_ef > float32.search_params().hnsw_ef
+    assert binary.hnsw_config().ef_construct == binary.hnsw_ef_construct
+
+
+def test_env_overrides_profile_defaults(monkeypatch):
+    monkeypatch.setenv("HNSW_EF", "512")
+    monkeypatch.setenv("HNSW_M", "8")
+
+    profile = get_profile("scalar")
+
+    assert profile.search_params().hnsw_ef == 512
+    assert profile.hnsw_config().m == 8
@@ -0,0 +1,79 @@
+import pytest
+from chunking import estimate_tokens
+from rerank import Reranker
+
+
+class FakeCrossEncoder:
+    """Scores a document by the number it starts with."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def rerank(self, query, documents, batch_size=64):
+        self.batch_sizes.append(batch_size)
+        return [float(doc.split()[0]) for doc in documents]
+
+
+def make_docs(sizes):
+    # Doc i scores i; sizes[i] extra words set its token count
+    return [
+        {"id": i, "text": f"{i} " + " ".join(["palavra"] * size)}
+        for i, size in enumerate(sizes)
+    ]
+
+
+@pytest.fixture
+def reranker(monkeypatch):
+    monkeypatch.setenv("RERANK_ENABLED", "true")
+    monkeypatch.setenv("RERANK_BATCH_SIZE", "4")
+
+    def build(token_budget):
+        monkeypatch.setenv("RERANK_TOKEN_BUDGET", str(token_budget))
+        return Reranker(model=FakeCrossEncoder())
+
+    return build
+
+
+def test_keeps_best_top_k_in_score_order(reranker):
+    docs = make_docs([5] * 10)
+    kept = reranker(token_budget=10_000).rerank("q", docs, top_k=3)
+
+    assert [d["id"] for d in kept] == [9, 8, 7]
+    assert [d["rerank_score"] for d in kept] == [9.0, 8.0, 7.0]
+
+
+@pytest.mark.parametrize("budget", [25, 50, 100, 200])
+def test_kept_docs_fit_token_budget(reranker, budget):
+    docs = make_docs([3, 40, 10, 25, 5, 60, 8, 15])
+    kept = reranker(token_budget=budget).rerank("q", docs, top_k=5)
+
+    assert 1 <= len(kept) <= 5
+    assert sum(estimate_tokens(d["text"]) for d in kept) <= budget
+    scores = [d["rerank_score"] for d in kept]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_skips_oversized_doc_for_smaller_lower_ranked_ones(reranker):
+    # Doc 2 ranks second but does not fit; docs 1 and 0 still do
+    docs = make_docs([5, 5, 200, 5])
+    kept = reranker(token_budget=30).rerank("q", docs, top_k=3)
+
+    assert [d["id"] for d in kept] == [3, 1, 0]
+
+
+def test_best_doc_is_kept_even_over_budget(reranker):
+    docs = make_docs([5, 300])
+    kept = reranker(token_budget=10).rerank("q", docs, top_k=2)
+
+    assert [d["id"] for d in kept] == [1]
+
+
+def test_scores_in_configured_batches_and_records_stats(reranker):
+    rr = reranker(token_budget=1024)
+    assert rr.rerank("q", [], top_k=3) == []
+
+    rr.rerank("q", make_docs([5] * 6), top_k=3)
+    assert rr.model.batch_sizes == [4]
+    stats = rr.stats()
+    assert stats["calls"] == 1
+    assert stats["enabled"] is True
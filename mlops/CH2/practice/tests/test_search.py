@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+from health import CLOSED, HALF_OPEN, OPEN, HealthMonitor
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    # Reset timeout elapsed: the next allow() is the half-open trial
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_embedder_failure_in_half_open_trial_does_not_wedge_breaker(vector_db, batch):
+    open_breaker(vector_db.breaker)
+    vector_db.embedder.fail = True
+
+    with pytest.raises(RuntimeError):
+        if batch:
+            vector_db.search_batch(["dengue"], top_k=3)
+        else:
+            vector_db.search("dengue", top_k=3)
+    assert vector_db.breaker.state != HALF_OPEN
+
+    # The next call may try again, and a successful one closes the breaker
+    vector_db.embedder.fail = False
+    vector_db.ingest(["Dengue: febre alta e dor no corpo."], source="test")
+    assert vector_db.search("dengue", top_k=3)
+    assert vector_db.breaker.state == CLOSED
+
+
+def test_health_probe_recovers_breaker_after_embedder_failure(vector_db):
+    open_breaker(vector_db.breaker)
+    vector_db.embedder.fail = True
+    with pytest.raises(RuntimeError):
+        vector_db.search("dengue", top_k=3)
+
+    monitor = HealthMonitor(interval=1)
+    monitor.register(
+        "vector_db", lambda: asyncio.to_thread(vector_db.check_health), vector_db.breaker
+    )
+    asyncio.run(monitor.probe_all())
+    assert vector_db.breaker.state == CLOSED
+
+
+def test_invalid_requests_do_not_open_breaker(vector_db):
+    vector_db.ingest(["Dengue: febre alta e dor no corpo."], source="test")
+
+    for _ in range(vector_db.breaker.failure_threshold + 1):
+        assert vector_db.search("dengue", top_k=-1) == []
+    with pytest.raises(Exception):
+        vector_db.search_batch(["dengue"], top_k=-1)
+
+    assert vector_db.breaker.state == CLOSED
+    assert vector_db.search("dengue", top_k=3)
+
+
+def test_qdrant_outage_opens_breaker(vector_db, monkeypatch):
+    from qdrant_client.http.exceptions import UnexpectedResponse
+
+    def unavailable(*args, **kwargs):
+        raise UnexpectedResponse(503, "Service Unavailable", b"", None)
+
+    monkeypatch.setattr(vector_db.qdrant, "query_points", unavailable, raising=False)
+    for _ in range(vector_db.breaker.failure_threshold):
+        assert vector_db.search("dengue", top_k=3) == []
+
+    assert vector_db.breaker.state == OPEN
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/search", {"query": "dengue", "top_k": -1}),
+        ("/search/batch", {"queries": ["dengue"], "top_k": 0}),
+        ("/ask", {"question": "dengue", "top_k": 10_000}),
+        ("/ask/batch", {"questions": ["dengue"], "top_k": -1}),
+    ],
+)
+def test_out_of_range_top_k_is_rejected(path, body):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    assert TestClient(app).post(path, json=body).status_code == 422
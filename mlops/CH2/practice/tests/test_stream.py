@@ -0,0 +1,73 @@
+import asyncio
+
+from cache import AnswerCache
+from metrics import REGISTRY
+from prompting import PromptBuilder
+
+
+class FakeLLM:
+    model_params = {"model": "fake"}
+
+    async def stream_tokens(self, messages):
+        for token in ("Repouso", " e", " hidratação."):
+            yield token
+
+    async def generate_response(self, messages, timeout=None):
+        return "Repouso e hidratação.", True
+
+
+def make_orchestrator():
+    import services
+
+    # Only what ask_stream touches; no models, Qdrant or HTTP clients
+    orchestrator = services.OrchestratorService.__new__(services.OrchestratorService)
+    orchestrator.retrieve = lambda *args: [{"text": "Gripe: infecção viral.", "source": "a.txt"}]
+    orchestrator.answer_cache = AnswerCache()
+    orchestrator.prompts = PromptBuilder(token_counter=lambda text: len(text.split()))
+    orchestrator.llm_service = FakeLLM()
+    return orchestrator
+
+
+def ttft_count(source):
+    return REGISTRY.get_sample_value("rag_llm_ttft_seconds_count", {"source": source}) or 0
+
+
+async def collect(orchestrator, question):
+    return [event async for event in orchestrator.ask_stream(question)]
+
+
+def test_ask_stream_observes_ttft_once_per_answer():
+    orchestrator = make_orchestrator()
+    llm_before, cache_before = ttft_count("llm"), ttft_count("cache")
+
+    events = asyncio.run(collect(orchestrator, "Como tratar gripe?"))
+    assert [name for name, _ in events].count("token") == 3
+    assert ttft_count("llm") == llm_before + 1
+
+    # Same question and context: replayed from the answer cache
+    events = asyncio.run(collect(orchestrator, "Como tratar gripe?"))
+    assert events[-1][1]["cached"] is True
+    assert ttft_count("llm") == llm_before + 1
+    assert ttft_count("cache") == cache_before + 1
+
+
+def test_ask_batch_isolates_item_errors():
+    orchestrator = make_orchestrator()
+    orchestrator.batch_llm_concurrency = 2
+    orchestrator.retrieve_batch = lambda questions, *args: [
+        [{"text": "Gripe: infecção viral.", "source": "a.txt"}] for _ in questions
+    ]
+    answer = orchestrator._answer
+
+    async def flaky_answer(question, docs, debug=False):
+        if question == "quebra":
+            raise ValueError("prompt build failed")
+        return await answer(question, docs, debug)
+
+    orchestrator._answer = flaky_answer
+    results = asyncio.run(orchestrator.ask_batch(["Como tratar gripe?", "quebra"]))
+
+    assert results[0]["error"] is None
+    assert results[0]["answer"]
+    assert results[1]["answer"] is None
+    assert results[1]["error"] == "prompt build failed"
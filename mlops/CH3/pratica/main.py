@@ -1,15 +1,31 @@
 import asyncio
+import hashlib
+import logging
 import os
 import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List
+from typing import Any, List
 
+import chromadb
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile, status
+from fastapi import Depends, FastAPI, File, HTTPException, Request, UploadFile, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
+from langchain_chroma import Chroma
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_core.embeddings import Embeddings
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
@@ -20,6 +36,8 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "/tmp/api_autoreg_uploads"))
+# Files the API keeps for itself; outside UPLOAD_DIR so no upload can overwrite them
+CACHE_DIR = Path(os.getenv("CACHE_DIR", "/tmp/api_autoreg_cache"))
 def _load_api_key(env_var: str) -> str:
     """Read an API key from the environment, returning '' if unset or 'commented out'
     with a leading '#' (a common .env mistake: OPENAI_API_KEY=#sk-...)."""
@@ -33,10 +51,22 @@ GOOGLE_MODEL = os.getenv("GOOGLE_MODEL", "gemini-2.0-flash")
 CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
 CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "documents")
+# Seconds between ChromaDB heartbeats on the shared client (see RAGResources)
+CHROMA_HEALTHCHECK_INTERVAL = float(os.getenv("CHROMA_HEALTHCHECK_INTERVAL", "30"))
 SUPPORTED_EXTENSIONS = {".pdf", ".txt"}
-_vs_lock = asyncio.Lock()
+# Chunks embedded + written per call, and how many such batches run at once
+# across all uploads (bounded by the embedding provider's rate limits)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+# Background workers indexing uploaded files, and finished jobs kept for polling
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "1000"))
+# Persistent cache of chunk embeddings ("" disables it) and its size in vectors
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", str(CACHE_DIR / "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 
@@ -76,6 +106,16 @@ def decode_access_token(token: str) -> str:
     return sub
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One set of RAG clients for the whole process (see RAGResources)
+    app.state.rag = RAGResources()
+    app.state.ingest_slots = asyncio.Semaphore(INGEST_CONCURRENCY)
+    ingest_jobs.start(app, INGEST_WORKERS)
+    yield
+    await ingest_jobs.stop()
+
+
 app = FastAPI(
     title="Document Q&A API",
     description="""
@@ -85,6 +125,7 @@ Receives one or more uploaded documents, saves them, and builds a RAG index with
 
 ### Features
 - Upload **multiple documents** in a single request (PDF and TXT supported for RAG)
+- Indexing runs in the background; follow it via `/documents/jobs/{job_id}`
 - Supports retrieval-augmented generation via `/rag/query`
 - Health check endpoint for container orchestration
 """,
@@ -95,6 +136,7 @@ Receives one or more uploaded documents, saves them, and builds a RAG index with
     license_info={
         "name": "MIT",
     },
+    lifespan=lifespan,
 )
 
 # ---------------------------------------------------------------------------
@@ -122,13 +164,45 @@ if _PHOENIX_ENDPOINT:
 # Pydantic models
 # ---------------------------------------------------------------------------
 
+class IngestJobResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str  # "queued", "running", "succeeded", "failed" or "skipped"
+    chunks: int | None = None
+    error: str | None = None
+    detail: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    duration_seconds: float | None = None
+
+
 class DocumentsResponse(BaseModel):
     documents: List[str]
+    jobs: List[IngestJobResponse]
 
     model_config = {
         "json_schema_extra": {
             "examples": [
-                {"documents": ["report.pdf", "invoice.xlsx", "contract.docx"]}
+                {
+                    "documents": ["report.pdf", "invoice.xlsx"],
+                    "jobs": [
+                        {
+                            "job_id": "3f2b9c0e6d1a4b8f9e7c5a2d1b0f8e6c",
+                            "filename": "report.pdf",
+                            "status": "queued",
+                            "created_at": "2025-01-01T12:00:00Z",
+                        },
+                        {
+                            "job_id": "9a8b7c6d5e4f4a3b2c1d0e9f8a7b6c5d",
+                            "filename": "invoice.xlsx",
+                            "status": "skipped",
+                            "detail": "Unsupported file type '.xlsx': saved but not indexed.",
+                            "created_at": "2025-01-01T12:00:00Z",
+                            "finished_at": "2025-01-01T12:00:00Z",
+                        },
+                    ],
+                }
             ]
         }
     }
@@ -209,54 +283,386 @@ def _get_embedding_function():
     raise RuntimeError("No embedding provider configured. Set OPENAI_API_KEY or GOOGLE_API_KEY.")
 
 
-def _ingest_file(path: Path) -> int:
-    import chromadb
-    from langchain_community.document_loaders import PyPDFLoader, TextLoader
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
-    from langchain_chroma import Chroma
+class CachedEmbeddings(Embeddings):
+    """Wraps an embedding client with a persistent SQLite cache of chunk vectors.
+
+    Entries are keyed by provider (client class), model and the SHA-256 of
+    the chunk text, so re-uploading an unchanged or lightly edited file only
+    sends the new chunks to the remote API. At most `max_entries` vectors
+    are kept; the least recently used are evicted first. Queries are not
+    cached: some providers embed them differently from documents.
+    """
+
+    def __init__(self, embeddings: Embeddings, path: str, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.namespace = f"{type(embeddings).__name__}:{getattr(embeddings, 'model', '')}"
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._size = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode()).hexdigest()
+
+    def _get(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            try:
+                # Stay well below SQLite's limit on bound parameters
+                for i in range(0, len(keys), 500):
+                    batch = keys[i:i + 500]
+                    marks = ",".join("?" * len(batch))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                    ).fetchall()
+                    found.update((key, array("f", blob).tolist()) for key, blob in rows)
+                    with self._db:
+                        self._db.execute(
+                            f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                            [time.time(), *batch],
+                        )
+            except sqlite3.Error as exc:
+                logging.warning("Embedding cache read failed (%s). Embedding all chunks.", exc)
+        return found
+
+    def _put(self, vectors: dict[str, list[float]]) -> None:
+        now = time.time()
+        # float32, like the vectors ChromaDB stores
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in vectors.items()]
+        with self._lock:
+            try:
+                with self._db:
+                    cursor = self._db.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+                    )
+                    self._size += cursor.rowcount
+                    if self._size > self.max_entries:
+                        self._db.execute(
+                            "DELETE FROM embeddings WHERE key IN "
+                            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                            (self._size - self.max_entries,),
+                        )
+                        self._size = self.max_entries
+            except sqlite3.Error as exc:
+                logging.warning("Embedding cache write failed (%s).", exc)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = self._get(list(set(keys)))
+        # Identical chunks are sent once
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            embedded = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            self._put(embedded)
+            vectors.update(embedded)
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+
+def _build_openai_llm():
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        api_key=OPENAI_API_KEY,
+        temperature=0,
+    )
+
 
+def _build_gemini_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=GOOGLE_MODEL,
+        google_api_key=GOOGLE_API_KEY,
+        temperature=0,
+    )
+
+
+def _connect_chroma():
+    return chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+
+
+class RAGResources:
+    """Long-lived clients shared by every RAG request.
+
+    Created once in the app lifespan instead of per request: the Chroma
+    client, the LangChain `Chroma` wrapper, the embedding client (behind
+    CachedEmbeddings) and the chat models (all thread-safe, each keeping
+    its own HTTP connection pool).
+    Every client is built on first use. The Chroma connection is checked
+    with a heartbeat at most every CHROMA_HEALTHCHECK_INTERVAL seconds and
+    rebuilt when the check fails or after `reset()`.
+    """
+
+    def __init__(self, client_factory=None, embeddings=None, llm_factories=None):
+        self._client_factory = client_factory or _connect_chroma
+        self._embeddings = embeddings
+        self._llm_factories = llm_factories or {
+            "openai": _build_openai_llm,
+            "gemini": _build_gemini_llm,
+        }
+        self._llms: dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._client = None
+        self._vector_store = None
+        self._checked_at = 0.0
+
+    @property
+    def embeddings(self):
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = _get_embedding_function()
+                if EMBEDDING_CACHE_PATH:
+                    self._embeddings = CachedEmbeddings(self._embeddings, EMBEDDING_CACHE_PATH)
+            return self._embeddings
+
+    def client(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._client is not None and now - self._checked_at >= CHROMA_HEALTHCHECK_INTERVAL:
+                try:
+                    self._client.heartbeat()
+                    self._checked_at = now
+                except Exception as exc:
+                    logging.warning("ChromaDB heartbeat failed (%s). Reconnecting.", exc)
+                    self._client = self._vector_store = None
+            if self._client is None:
+                self._client = self._client_factory()
+                self._vector_store = None
+                self._checked_at = now
+            return self._client
+
+    def collection(self):
+        return self.client().get_or_create_collection(CHROMA_COLLECTION)
+
+    def vector_store(self) -> Chroma:
+        with self._lock:
+            client = self.client()
+            if self._vector_store is None:
+                self._vector_store = Chroma(
+                    collection_name=CHROMA_COLLECTION,
+                    embedding_function=self.embeddings,
+                    client=client,
+                )
+            return self._vector_store
+
+    def llm(self, provider: str):
+        with self._lock:
+            if provider not in self._llms:
+                self._llms[provider] = self._llm_factories[provider]()
+            return self._llms[provider]
+
+    def reset(self) -> None:
+        """Drops the Chroma connection; the next call reconnects."""
+        with self._lock:
+            self._client = self._vector_store = None
+
+    @contextmanager
+    def reconnect_on_error(self):
+        """Resets the Chroma connection if the block fails, then re-raises."""
+        try:
+            yield
+        except Exception:
+            self.reset()
+            raise
+
+
+def _save_upload(file: UploadFile, dest: Path) -> None:
+    # Write to a temp name and rename: concurrent uploads of the same
+    # filename never leave a half-written file behind
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.part")
+    with tmp.open("wb") as f:
+        shutil.copyfileobj(file.file, f)
+    os.replace(tmp, dest)
+
+
+def _load_chunks(path: Path) -> list:
     if path.suffix == ".pdf":
         loader = PyPDFLoader(str(path))
     else:
         loader = TextLoader(str(path), encoding="utf-8")
 
     docs = loader.load()
-    chunks = RecursiveCharacterTextSplitter(
+    return RecursiveCharacterTextSplitter(
         chunk_size=1000, chunk_overlap=150
     ).split_documents(docs)
 
-    client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
-    vs = Chroma(
-        collection_name=CHROMA_COLLECTION,
-        embedding_function=_get_embedding_function(),
-        client=client,
-    )
-    vs.add_documents(chunks)
+
+def _add_chunks(chunks: list, rag: RAGResources) -> None:
+    # Embeds and writes one batch. No app-level lock: the shared HttpClient
+    # is thread-safe and the Chroma server serializes concurrent writes.
+    with rag.reconnect_on_error():
+        rag.vector_store().add_documents(chunks)
+
+
+class IngestError(Exception):
+    """A batch failed while indexing a file; `chunks` had already been stored."""
+
+    def __init__(self, cause: Exception, chunks: int):
+        super().__init__(f"{type(cause).__name__}: {cause}")
+        self.chunks = chunks
+
+
+async def _ingest_file(path: Path, rag: RAGResources, slots: asyncio.Semaphore) -> int:
+    """Loads, splits and indexes one file; returns the number of chunks.
+
+    Chunks are embedded and written in batches of INGEST_BATCH_SIZE, each
+    holding one of the `slots` shared by every upload, so batches of
+    several files (and of one large file) run in parallel while the total
+    concurrency stays bounded.
+
+    After the first failed batch no further batch of the file is started;
+    the ones already running are waited for, and IngestError reports how
+    many chunks were stored.
+    """
+    chunks = await asyncio.to_thread(_load_chunks, path)
+    stored = 0
+    errors: list[Exception] = []
+
+    async def add(batch: list) -> None:
+        nonlocal stored
+        async with slots:
+            if errors:
+                return
+            try:
+                await asyncio.to_thread(_add_chunks, batch, rag)
+            except Exception as exc:
+                errors.append(exc)
+            else:
+                stored += len(batch)
+
+    await asyncio.gather(*(
+        add(chunks[i:i + INGEST_BATCH_SIZE])
+        for i in range(0, len(chunks), INGEST_BATCH_SIZE)
+    ))
+    if errors:
+        raise IngestError(errors[0], stored) from errors[0]
     # HINT (Desafio 2-A): este valor já está disponível — como expô-lo na resposta do endpoint?
-    return len(chunks)
+    return stored
 
 
-def _run_rag_query(question: str) -> dict | None:
-    import logging
-    import chromadb
-    from langchain_openai import ChatOpenAI
-    from langchain_chroma import Chroma
-    from langchain_core.prompts import ChatPromptTemplate
-    from langchain_core.output_parsers import StrOutputParser
-    from langchain_core.runnables import RunnablePassthrough
-
-    client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
-    collection = client.get_or_create_collection(CHROMA_COLLECTION)
-    if collection.count() == 0:
-        return None
+class IngestionJobs:
+    """Tracks one indexing job per uploaded file and runs them in the background.
 
-    vs = Chroma(
-        collection_name=CHROMA_COLLECTION,
-        embedding_function=_get_embedding_function(),
-        client=client,
-    )
+    `submit` queues a saved file and returns its job at once; the workers
+    started by `start` (in the app lifespan) run `_ingest_file` and record
+    the chunk count, timings and any error. Files that are not indexed get a
+    job that is already finished (`record`). Only the most recent `history`
+    jobs are kept.
+    """
+
+    TERMINAL = {"succeeded", "failed", "skipped"}
+
+    def __init__(self, history: int = INGEST_JOB_HISTORY):
+        self.history = history
+        self.jobs: OrderedDict[str, dict] = OrderedDict()
+        self._paths: dict[str, Path] = {}
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self, app: FastAPI, workers: int) -> None:
+        # The queue belongs to the running event loop, so it is created here
+        self._queue = asyncio.Queue()
+        for job_id in self._paths:
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker(app)) for _ in range(workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def get(self, job_id: str) -> dict | None:
+        return self.jobs.get(job_id)
+
+    def submit(self, filename: str, path: Path) -> dict:
+        job = self._new_job(filename, "queued")
+        self._paths[job["job_id"]] = path
+        if self._queue is not None:
+            self._queue.put_nowait(job["job_id"])
+        return job
+
+    def record(self, filename: str, status: str, *, error: str | None = None, detail: str | None = None) -> dict:
+        job = self._new_job(filename, status)
+        job.update(error=error, detail=detail, finished_at=job["created_at"])
+        return job
+
+    def _new_job(self, filename: str, status: str) -> dict:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "filename": filename,
+            "status": status,
+            "chunks": None,
+            "error": None,
+            "detail": None,
+            "created_at": datetime.now(timezone.utc),
+            "started_at": None,
+            "finished_at": None,
+            "duration_seconds": None,
+        }
+        self.jobs[job["job_id"]] = job
+        # Drop the oldest finished jobs; queued and running ones are kept
+        finished = [jid for jid, j in self.jobs.items() if j["status"] in self.TERMINAL]
+        for jid in finished[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[jid]
+        return job
+
+    async def _worker(self, app: FastAPI) -> None:
+        while True:
+            job_id = await self._queue.get()
+            path = self._paths.pop(job_id, None)
+            job = self.jobs.get(job_id)
+            if job is None or path is None:
+                continue
+            job.update(status="running", started_at=datetime.now(timezone.utc))
+            start = time.perf_counter()
+            try:
+                job["chunks"] = await _ingest_file(path, app.state.rag, app.state.ingest_slots)
+                job["status"] = "succeeded"
+            except asyncio.CancelledError:
+                job.update(status="failed", error="Interrupted by API shutdown.")
+                raise
+            except IngestError as exc:
+                logging.exception("Indexing %s failed after %d chunks", job["filename"], exc.chunks)
+                job.update(status="failed", chunks=exc.chunks, error=str(exc))
+            except Exception as exc:
+                logging.exception("Indexing %s failed", job["filename"])
+                job.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+            finally:
+                job["finished_at"] = datetime.now(timezone.utc)
+                job["duration_seconds"] = round(time.perf_counter() - start, 3)
+
+
+ingest_jobs = IngestionJobs()
+
+
+def _run_rag_query(question: str, rag: RAGResources) -> dict | None:
+    """Retrieves once and answers with OpenAI, falling back to Gemini.
+
+    The retrieved chunks feed both the prompt and `sources`, and the same
+    prompt input is reused by the fallback: one embedding call and one
+    Chroma query per question. Returns None when nothing is indexed.
+    """
     # HINT (Desafio 2-B): o valor 4 está fixo — como torná-lo configurável via QueryRequest?
-    retriever = vs.as_retriever(search_kwargs={"k": 4})
+    with rag.reconnect_on_error():
+        retriever = rag.vector_store().as_retriever(search_kwargs={"k": 4})
+        source_docs = retriever.invoke(question)
+    if not source_docs:
+        return None
 
     prompt = ChatPromptTemplate.from_messages([
         ("human", "Answer the question based on the following context:\n\n{context}\n\nQuestion: {question}"),
@@ -265,37 +671,21 @@ def _run_rag_query(question: str) -> dict | None:
     def format_docs(docs):
         return "\n\n".join(doc.page_content for doc in docs)
 
-    source_docs = retriever.invoke(question)
+    inputs = {"context": format_docs(source_docs), "question": question}
     sources = list({doc.metadata.get("source", "unknown") for doc in source_docs})
 
     def _invoke(llm) -> str:
-        chain = (
-            {"context": retriever | format_docs, "question": RunnablePassthrough()}
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
-        return chain.invoke(question)
+        chain = prompt | llm | StrOutputParser()
+        return chain.invoke(inputs)
 
     # Primary: OpenAI
     try:
-        llm = ChatOpenAI(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            api_key=OPENAI_API_KEY,
-            temperature=0,
-        )
-        return {"answer": _invoke(llm), "sources": sources, "provider": "openai"}
+        return {"answer": _invoke(rag.llm("openai")), "sources": sources, "provider": "openai"}
     except Exception as exc:
         logging.warning("OpenAI LLM failed (%s). Falling back to Google Gemini.", exc)
 
     # Fallback: Google Gemini
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    llm = ChatGoogleGenerativeAI(
-        model=GOOGLE_MODEL,
-        google_api_key=GOOGLE_API_KEY,
-        temperature=0,
-    )
-    return {"answer": _invoke(llm), "sources": sources, "provider": "gemini"}
+    return {"answer": _invoke(rag.llm("gemini")), "sources": sources, "provider": "gemini"}
 
 
 # ---------------------------------------------------------------------------
@@ -343,17 +733,19 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     response_model=DocumentsResponse,
     summary="Upload Documents",
     description="""
-Upload one or more documents. Files are saved to disk and indexed for RAG (PDF and TXT only).
+Upload one or more documents. Files are saved to disk and queued for RAG indexing (PDF and TXT only).
 
 **Accepted formats for indexing:** PDF, TXT
 
 **Request:** `multipart/form-data` with one or more `files` fields.
 
-**Response:** JSON array with the filename of each uploaded document.
+**Response:** the filename of each uploaded document and one ingestion job per file.
+The response is returned as soon as the files are saved; poll `GET /documents/jobs/{job_id}`
+to follow the indexing.
 """,
     tags=["Documents"],
     responses={
-        200: {"description": "List of uploaded document names"},
+        200: {"description": "Uploaded document names and their ingestion jobs"},
         422: {"description": "Validation error — no files provided"},
     },
 )
@@ -361,21 +753,47 @@ async def receive_documents(
     files: List[UploadFile] = File(..., description="One or more documents to upload"),
     current_user: str = Depends(get_current_user),
 ):
-    saved = []
-    async with _vs_lock:
-        for file in files:
-            suffix = Path(file.filename).suffix.lower()
-            try:
-                dest = UPLOAD_DIR / file.filename
-                with dest.open("wb") as f:
-                    shutil.copyfileobj(file.file, f)
-                if suffix in SUPPORTED_EXTENSIONS and (OPENAI_API_KEY or GOOGLE_API_KEY):
-                    await asyncio.to_thread(_ingest_file, dest)
-                    # HINT (Desafio 2-C): como remover um documento daqui e do ChromaDB?
-            except Exception:
-                pass  # ingestion failure does not fail the upload response
-            saved.append(file.filename)
-    return {"documents": saved}
+    async def handle(file: UploadFile) -> dict:
+        suffix = Path(file.filename).suffix.lower()
+        dest = UPLOAD_DIR / file.filename
+        try:
+            await asyncio.to_thread(_save_upload, file, dest)
+        except OSError as exc:
+            logging.exception("Saving %s failed", file.filename)
+            return ingest_jobs.record(file.filename, "failed", error=f"Could not save file: {exc}")
+        if suffix not in SUPPORTED_EXTENSIONS:
+            return ingest_jobs.record(
+                file.filename, "skipped",
+                detail=f"Unsupported file type '{suffix}': saved but not indexed.",
+            )
+        if not (OPENAI_API_KEY or GOOGLE_API_KEY):
+            return ingest_jobs.record(
+                file.filename, "skipped",
+                detail="No embedding provider configured: saved but not indexed.",
+            )
+        # HINT (Desafio 2-C): como remover um documento daqui e do ChromaDB?
+        return ingest_jobs.submit(file.filename, dest)
+
+    jobs = await asyncio.gather(*(handle(file) for file in files))
+    return {"documents": [job["filename"] for job in jobs], "jobs": jobs}
+
+
+@app.get(
+    "/documents/jobs/{job_id}",
+    response_model=IngestJobResponse,
+    summary="Ingestion job status",
+    description="Status of the indexing of one uploaded file: chunk count, timings and the error if it failed.",
+    tags=["Documents"],
+    responses={
+        200: {"description": "Job status"},
+        404: {"description": "Unknown job ID"},
+    },
+)
+async def get_ingest_job(job_id: str, current_user: str = Depends(get_current_user)):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
 
 
 @app.post(
@@ -390,10 +808,11 @@ async def receive_documents(
     },
 )
 async def rag_query(
+    request: Request,
     body: QueryRequest,
     current_user: str = Depends(get_current_user),
 ):
-    result = await asyncio.to_thread(_run_rag_query, body.question)
+    result = await asyncio.to_thread(_run_rag_query, body.question, request.app.state.rag)
     if result is None:
         raise HTTPException(status_code=404, detail="No documents indexed yet.")
     return result
@@ -409,13 +828,15 @@ async def rag_query(
         200: {"description": "List of indexed document filenames"},
     },
 )
-async def list_indexed_documents(current_user: str = Depends(get_current_user)):
-    import chromadb
-    client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
-    collection = client.get_or_create_collection(CHROMA_COLLECTION)
-    if collection.count() == 0:
-        return {"documents": []}
-    results = collection.get(include=["metadatas"])
+async def list_indexed_documents(
+    request: Request, current_user: str = Depends(get_current_user)
+):
+    rag: RAGResources = request.app.state.rag
+    with rag.reconnect_on_error():
+        collection = await asyncio.to_thread(rag.collection)
+        if await asyncio.to_thread(collection.count) == 0:
+            return {"documents": []}
+        results = await asyncio.to_thread(collection.get, include=["metadatas"])
     metadatas = results["metadatas"] or []
     names = sorted({Path(str(m.get("source", "unknown"))).name for m in metadatas})
     return {"documents": names}
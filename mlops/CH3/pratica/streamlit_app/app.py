@@ -12,6 +12,9 @@ import streamlit as st
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 API_USERNAME = os.getenv("API_USERNAME", "admin")
 API_PASSWORD = os.getenv("API_PASSWORD", "changeme")
+# How long the sidebar waits for indexing jobs, and how often it polls them
+INDEX_WAIT_SECONDS = float(os.getenv("INDEX_WAIT_SECONDS", "600"))
+INDEX_POLL_SECONDS = float(os.getenv("INDEX_POLL_SECONDS", "1"))
 
 # ---------------------------------------------------------------------------
 # Auth helpers
@@ -46,17 +49,55 @@ def _auth_headers() -> dict[str, str]:
 # API calls
 # ---------------------------------------------------------------------------
 
-def api_upload(files: list) -> list[str]:
-    """Upload files to the API; return list of indexed filenames."""
+FINISHED_JOB_STATES = {"succeeded", "failed", "skipped"}
+
+
+def api_upload(files: list) -> list[dict]:
+    """Upload files to the API; return one ingestion job per file.
+
+    The API answers once the files are saved; indexing continues in the
+    background (see api_job).
+    """
     multipart = [("files", (f.name, f.getvalue(), f.type or "application/octet-stream")) for f in files]
     resp = requests.post(
         f"{API_BASE_URL}/documents",
         files=multipart,
         headers=_auth_headers(),
-        timeout=120,
+        timeout=60,
     )
     resp.raise_for_status()
-    return resp.json()["documents"]
+    return resp.json()["jobs"]
+
+
+def api_job(job_id: str) -> dict:
+    """Fetch the current status of an ingestion job."""
+    resp = requests.get(
+        f"{API_BASE_URL}/documents/jobs/{job_id}",
+        headers=_auth_headers(),
+        timeout=10,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def wait_for_jobs(jobs: list[dict], on_progress=None) -> list[dict]:
+    """Poll jobs until all have finished or INDEX_WAIT_SECONDS have passed.
+
+    Returns the latest status of each job; `on_progress(done, total)` is
+    called after every poll.
+    """
+    deadline = time.time() + INDEX_WAIT_SECONDS
+    while True:
+        jobs = [
+            job if job["status"] in FINISHED_JOB_STATES else api_job(job["job_id"])
+            for job in jobs
+        ]
+        done = sum(job["status"] in FINISHED_JOB_STATES for job in jobs)
+        if on_progress:
+            on_progress(done, len(jobs))
+        if done == len(jobs) or time.time() >= deadline:
+            return jobs
+        time.sleep(INDEX_POLL_SECONDS)
 
 
 def api_list_documents() -> list[str]:
@@ -113,14 +154,31 @@ with st.sidebar:
     )
 
     if st.button("Upload and Index", disabled=not uploaded_files):
-        with st.spinner("Uploading and indexing…"):
-            try:
-                names = api_upload(uploaded_files)
-                st.success(f"Indexed: {', '.join(names)}")
-            except requests.HTTPError as e:
-                st.error(f"Upload failed: {e.response.text}")
-            except Exception as e:
-                st.error(f"Upload error: {e}")
+        try:
+            with st.spinner("Uploading…"):
+                jobs = api_upload(uploaded_files)
+            progress = st.progress(0.0, text="Indexing…")
+            jobs = wait_for_jobs(
+                jobs,
+                lambda done, total: progress.progress(done / total, text=f"Indexing… {done}/{total}"),
+            )
+            progress.empty()
+            for job in jobs:
+                if job["status"] == "succeeded":
+                    st.success(
+                        f"Indexed {job['filename']}: {job['chunks']} chunks "
+                        f"in {job['duration_seconds']:.1f}s"
+                    )
+                elif job["status"] == "skipped":
+                    st.info(f"{job['filename']}: {job['detail']}")
+                elif job["status"] == "failed":
+                    st.error(f"Indexing {job['filename']} failed: {job['error']}")
+                else:
+                    st.warning(f"{job['filename']} is still being indexed ({job['status']}).")
+        except requests.HTTPError as e:
+            st.error(f"Upload failed: {e.response.text}")
+        except Exception as e:
+            st.error(f"Upload error: {e}")
 
     st.divider()
     st.subheader("Indexed Documents")
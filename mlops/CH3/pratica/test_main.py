@@ -33,7 +33,7 @@ def test_single_document():
         headers={"Authorization": f"Bearer {get_valid_token()}"},
     )
     assert response.status_code == 200
-    assert response.json() == {"documents": ["report.pdf"]}
+    assert response.json()["documents"] == ["report.pdf"]
 
 
 def test_multiple_documents():
@@ -47,9 +47,7 @@ def test_multiple_documents():
         headers={"Authorization": f"Bearer {get_valid_token()}"},
     )
     assert response.status_code == 200
-    assert response.json() == {
-        "documents": ["report.pdf", "invoice.xlsx", "contract.docx"]
-    }
+    assert response.json()["documents"] == ["report.pdf", "invoice.xlsx", "contract.docx"]
 
 
 def test_missing_files_returns_422():
@@ -154,3 +152,384 @@ def test_health_still_public_after_auth_added():
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
+
+
+# --- RAG resources tests ---
+
+class FakeChromaClient:
+    """Stands in for chromadb.HttpClient: an in-memory client whose heartbeat can fail."""
+
+    def __init__(self):
+        import chromadb
+
+        self.alive = True
+        self._client = chromadb.EphemeralClient()
+
+    def heartbeat(self):
+        if not self.alive:
+            raise ConnectionError("chroma is down")
+        return 0
+
+    def get_or_create_collection(self, name, **kwargs):
+        return self._client.get_or_create_collection(name, **kwargs)
+
+
+def test_rag_clients_are_reused_across_requests():
+    import main
+
+    clients = []
+
+    def factory():
+        clients.append(FakeChromaClient())
+        return clients[-1]
+
+    with TestClient(app) as c:
+        c.app.state.rag = main.RAGResources(client_factory=factory)
+        headers = {"Authorization": f"Bearer {get_valid_token()}"}
+        for _ in range(3):
+            assert c.get("/rag/documents", headers=headers).status_code == 200
+    assert len(clients) == 1
+
+
+def test_rag_resources_reconnect_when_heartbeat_fails(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "CHROMA_HEALTHCHECK_INTERVAL", 0)
+    clients = []
+
+    def factory():
+        clients.append(FakeChromaClient())
+        return clients[-1]
+
+    rag = main.RAGResources(client_factory=factory)
+    first = rag.client()
+    assert rag.client() is first
+
+    first.alive = False
+    assert rag.client() is not first
+    assert len(clients) == 2
+
+
+# --- RAG query instrumentation tests ---
+
+def make_counting_rag(monkeypatch, openai_llm):
+    """RAGResources over an in-memory Chroma that counts embedding calls and vector queries."""
+    import uuid
+
+    import main
+    from chromadb.api.models.Collection import Collection
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.language_models import FakeListChatModel
+
+    calls = {"embed": 0, "query": 0}
+
+    class CountingEmbeddings(DeterministicFakeEmbedding):
+        def embed_query(self, text):
+            calls["embed"] += 1
+            return super().embed_query(text)
+
+    original_query = Collection.query
+
+    def counting_query(self, *args, **kwargs):
+        calls["query"] += 1
+        return original_query(self, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, "query", counting_query)
+    monkeypatch.setattr(main, "CHROMA_COLLECTION", f"test_{uuid.uuid4().hex}")
+    rag = main.RAGResources(
+        client_factory=FakeChromaClient,
+        embeddings=CountingEmbeddings(size=16),
+        llm_factories={
+            "openai": lambda: openai_llm,
+            "gemini": lambda: FakeListChatModel(responses=["gemini answer"]),
+        },
+    )
+    rag.vector_store().add_documents([
+        Document(page_content="Revenue grew 10% in March.", metadata={"source": "march.pdf"}),
+        Document(page_content="Costs were flat in April.", metadata={"source": "april.pdf"}),
+    ])
+    return rag, calls
+
+
+def test_rag_query_retrieves_once(monkeypatch):
+    from langchain_core.language_models import FakeListChatModel
+
+    rag, calls = make_counting_rag(monkeypatch, FakeListChatModel(responses=["openai answer"]))
+    with TestClient(app) as c:
+        c.app.state.rag = rag
+        r = c.post(
+            "/rag/query",
+            json={"question": "How did revenue change?"},
+            headers={"Authorization": f"Bearer {get_valid_token()}"},
+        )
+    assert r.status_code == 200
+    assert r.json()["provider"] == "openai"
+    assert sorted(r.json()["sources"]) == ["april.pdf", "march.pdf"]
+    assert calls == {"embed": 1, "query": 1}
+
+
+def test_rag_query_fallback_reuses_retrieval(monkeypatch):
+    from langchain_core.language_models import FakeListChatModel
+
+    class FailingLLM(FakeListChatModel):
+        def _call(self, *args, **kwargs):
+            raise RuntimeError("openai is down")
+
+    rag, calls = make_counting_rag(monkeypatch, FailingLLM(responses=[""]))
+    with TestClient(app) as c:
+        c.app.state.rag = rag
+        r = c.post(
+            "/rag/query",
+            json={"question": "How did revenue change?"},
+            headers={"Authorization": f"Bearer {get_valid_token()}"},
+        )
+    assert r.status_code == 200
+    assert r.json()["answer"] == "gemini answer"
+    assert r.json()["provider"] == "gemini"
+    assert calls == {"embed": 1, "query": 1}
+
+
+def test_rag_query_empty_collection_returns_404(monkeypatch):
+    import uuid
+
+    import main
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    monkeypatch.setattr(main, "CHROMA_COLLECTION", f"test_{uuid.uuid4().hex}")
+    with TestClient(app) as c:
+        c.app.state.rag = main.RAGResources(
+            client_factory=FakeChromaClient, embeddings=DeterministicFakeEmbedding(size=16)
+        )
+        r = c.post(
+            "/rag/query",
+            json={"question": "anything"},
+            headers={"Authorization": f"Bearer {get_valid_token()}"},
+        )
+    assert r.status_code == 404
+
+
+# --- Concurrent ingestion tests ---
+
+def test_documents_are_ingested_concurrently_within_the_limit(monkeypatch):
+    import asyncio
+    import threading
+    import time
+
+    import main
+
+    state = {"in_flight": 0, "max_in_flight": 0, "batches": []}
+    lock = threading.Lock()
+
+    def slow_add_chunks(chunks, rag):
+        with lock:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            state["batches"].append(chunks[0].metadata["source"])
+        time.sleep(0.05)
+        with lock:
+            state["in_flight"] -= 1
+
+    monkeypatch.setattr(main, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(main, "INGEST_BATCH_SIZE", 1)
+    monkeypatch.setattr(main, "_add_chunks", slow_add_chunks)
+    # Three paragraphs of ~900 chars: 3 chunks (= 3 batches) per file
+    content = "\n\n".join("word " * 180 for _ in range(3))
+    with TestClient(app) as c:
+        c.app.state.ingest_slots = asyncio.Semaphore(2)
+        r = c.post(
+            "/documents",
+            files=[("files", make_file(f"doc{i}.txt", content)) for i in range(3)],
+            headers={"Authorization": f"Bearer {get_valid_token()}"},
+        )
+        jobs = wait_for_jobs(c, r.json()["jobs"])
+    assert r.status_code == 200
+    assert r.json()["documents"] == ["doc0.txt", "doc1.txt", "doc2.txt"]
+    assert [job["status"] for job in jobs] == ["succeeded"] * 3
+    assert len(state["batches"]) == 9
+    assert state["max_in_flight"] == 2
+
+
+# --- Ingestion job tests ---
+
+def wait_for_jobs(c, jobs, timeout=10):
+    """Polls /documents/jobs/{id} until every job has finished."""
+    import time
+
+    headers = {"Authorization": f"Bearer {get_valid_token()}"}
+    deadline = time.monotonic() + timeout
+    while True:
+        current = [c.get(f"/documents/jobs/{job['job_id']}", headers=headers).json() for job in jobs]
+        if all(job["status"] in ("succeeded", "failed", "skipped") for job in current):
+            return current
+        assert time.monotonic() < deadline, f"jobs still pending: {current}"
+        time.sleep(0.02)
+
+
+def test_upload_returns_before_indexing_and_job_reports_chunks(monkeypatch):
+    import threading
+
+    import main
+
+    release = threading.Event()
+
+    def blocking_add_chunks(chunks, rag):
+        release.wait(timeout=5)
+
+    monkeypatch.setattr(main, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(main, "_add_chunks", blocking_add_chunks)
+    content = "\n\n".join("word " * 180 for _ in range(3))
+    headers = {"Authorization": f"Bearer {get_valid_token()}"}
+    with TestClient(app) as c:
+        r = c.post("/documents", files=[("files", make_file("notes.txt", content))], headers=headers)
+        job = r.json()["jobs"][0]
+        assert r.status_code == 200
+        assert job["filename"] == "notes.txt"
+        assert job["status"] in ("queued", "running")
+        release.set()
+        [job] = wait_for_jobs(c, [job])
+    assert job["status"] == "succeeded"
+    assert job["chunks"] == 3
+    assert job["error"] is None
+    assert job["duration_seconds"] >= 0
+
+
+def test_ingestion_error_is_reported_on_the_job(monkeypatch):
+    import main
+
+    def failing_add_chunks(chunks, rag):
+        raise ConnectionError("chroma is down")
+
+    monkeypatch.setattr(main, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(main, "_add_chunks", failing_add_chunks)
+    with TestClient(app) as c:
+        r = c.post(
+            "/documents",
+            files=[("files", make_file("notes.txt", "some text"))],
+            headers={"Authorization": f"Bearer {get_valid_token()}"},
+        )
+        [job] = wait_for_jobs(c, r.json()["jobs"])
+    assert r.status_code == 200
+    assert job["status"] == "failed"
+    assert job["error"] == "ConnectionError: chroma is down"
+
+
+def test_failed_batch_stops_the_file_and_reports_stored_chunks(monkeypatch):
+    import asyncio
+
+    import main
+
+    calls = []
+
+    def flaky_add_chunks(chunks, rag):
+        calls.append(len(chunks))
+        if len(calls) == 2:
+            raise ConnectionError("chroma is down")
+
+    monkeypatch.setattr(main, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(main, "INGEST_BATCH_SIZE", 1)
+    monkeypatch.setattr(main, "_add_chunks", flaky_add_chunks)
+    # Four paragraphs of ~900 chars: 4 batches, written one at a time
+    content = "\n\n".join("word " * 180 for _ in range(4))
+    with TestClient(app) as c:
+        c.app.state.ingest_slots = asyncio.Semaphore(1)
+        r = c.post(
+            "/documents",
+            files=[("files", make_file("notes.txt", content))],
+            headers={"Authorization": f"Bearer {get_valid_token()}"},
+        )
+        [job] = wait_for_jobs(c, r.json()["jobs"])
+    assert job["status"] == "failed"
+    assert job["error"] == "ConnectionError: chroma is down"
+    assert job["chunks"] == 1
+    assert len(calls) == 2
+
+
+def test_unsupported_file_gets_skipped_job():
+    headers = {"Authorization": f"Bearer {get_valid_token()}"}
+    r = client.post("/documents", files=[("files", make_file("invoice.xlsx"))], headers=headers)
+    job = r.json()["jobs"][0]
+    assert job["status"] == "skipped"
+    assert "'.xlsx'" in job["detail"]
+    assert client.get(f"/documents/jobs/{job['job_id']}", headers=headers).json() == job
+
+
+def test_unknown_job_returns_404():
+    r = client.get(
+        "/documents/jobs/does-not-exist",
+        headers={"Authorization": f"Bearer {get_valid_token()}"},
+    )
+    assert r.status_code == 404
+
+
+def test_job_status_requires_auth():
+    r = client.get("/documents/jobs/does-not-exist")
+    assert r.status_code == 401
+
+
+# --- Embedding cache tests ---
+
+class CountingEmbedding:
+    """Deterministic fake embedding client that records the texts it embeds."""
+
+    def __init__(self, model="fake-model"):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        self.model = model
+        self._fake = DeterministicFakeEmbedding(size=8)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return self._fake.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self._fake.embed_query(text)
+
+
+def test_embedding_cache_only_sends_new_chunks(tmp_path):
+    import main
+
+    path = str(tmp_path / "cache.sqlite3")
+    first = CountingEmbedding()
+    vectors = main.CachedEmbeddings(first, path).embed_documents(["a", "b", "a"])
+    assert first.embedded == ["a", "b"]
+
+    # A new instance (e.g. after an API restart) reads the same file
+    second = CountingEmbedding()
+    cache = main.CachedEmbeddings(second, path)
+    again = cache.embed_documents(["a", "b", "c"])
+    assert second.embedded == ["c"]
+    assert (cache.hits, cache.misses) == (2, 1)
+    for cached, original in zip(again[:2], vectors[:2]):
+        assert cached == pytest.approx(original, rel=1e-6)
+    assert again[2] == pytest.approx(second._fake.embed_documents(["c"])[0])
+
+
+def test_embedding_cache_is_keyed_by_model(tmp_path):
+    import main
+
+    path = str(tmp_path / "cache.sqlite3")
+    main.CachedEmbeddings(CountingEmbedding("model-a"), path).embed_documents(["a"])
+    other = CountingEmbedding("model-b")
+    main.CachedEmbeddings(other, path).embed_documents(["a"])
+    assert other.embedded == ["a"]
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    import time
+
+    import main
+
+    cache = main.CachedEmbeddings(CountingEmbedding(), str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.embed_documents(["a"])
+    time.sleep(0.01)
+    cache.embed_documents(["b"])
+    time.sleep(0.01)
+    cache.embed_documents(["a"])  # "a" is now more recent than "b"
+    time.sleep(0.01)
+    cache.embed_documents(["c"])
+
+    cache.embeddings.embedded.clear()
+    cache.embed_documents(["a", "b", "c"])
+    assert cache.embeddings.embedded == ["b"]